@@ -1,16 +1,29 @@
-import pygame
-import random
+import argparse
 import time
-import copy
+
+import pygame
+
+from engine import TetrisEngine, WIDTH, HEIGHT
+from planner import Planner
+from search import beam_search
+from profiler import make_profiler
+from render import Renderer
+import replay
 
 # 游戏参数
 BLOCK_SIZE = 35
 BORDER = 2
-WIDTH = 10
-HEIGHT = 20
 FPS = 60
+# AI 前瞻层数与每层保留的棋盘数（后台规划和加速模式共用）
+LOOKAHEAD = 2
+BEAM_WIDTH = 4
 PREVIEW_SIZE = BLOCK_SIZE * 4
 
+# 下一个方块预览位置（格）与预览框
+PREVIEW_X = WIDTH + 2
+PREVIEW_Y = 6
+PREVIEW_BOX = (PREVIEW_X*BLOCK_SIZE-10, PREVIEW_Y*BLOCK_SIZE-10, PREVIEW_SIZE+20, PREVIEW_SIZE+20)
+
 # 颜色定义
 COLORS = [
     (40, 40, 40), (255, 85, 85), (100, 200, 115),
@@ -18,263 +31,161 @@ COLORS = [
     (255, 220, 55), (160, 50, 190)
 ]
 
-# 方块形状
-SHAPES = [
-    {"shape": [[1,1,1,1]], "preview_offset": (1, 2)},
-    {"shape": [[1,1],[1,1]], "preview_offset": (1, 1)},
-    {"shape": [[1,1,1],[0,1,0]], "preview_offset": (1, 1)},
-    {"shape": [[1,1,1],[1,0,0]], "preview_offset": (1, 1)},
-    {"shape": [[1,1,1],[0,0,1]], "preview_offset": (1, 1)},
-    {"shape": [[1,1,0],[0,1,1]], "preview_offset": (1, 1)},
-    {"shape": [[0,1,1],[1,1,0]], "preview_offset": (1, 1)}
-]
-
-class Tetris:
-    def __init__(self, ai_mode=True):
+class Tetris(TetrisEngine):
+    def __init__(self, ai_mode=True, weights=None, profiler=None, speed=1, turbo=False,
+                 frame_skip=None):
+        # speed: 每个渲染帧推进的模拟步数（可为小数），1 即每帧执行一个操作
+        # turbo: 加速模式，每个模拟步直接放下一整块方块
+        # frame_skip: 每隔几帧渲染一次，加速模式默认 4
         pygame.init()
         self.screen = pygame.display.set_mode((BLOCK_SIZE*(WIDTH+7), BLOCK_SIZE*HEIGHT))
         pygame.display.set_caption("AI Tetris Pro")
         self.clock = pygame.time.Clock()
         self.ai_mode = ai_mode
+        self.speed = speed
+        # 没有指定 frame_skip 时随加速模式切换（见 set_turbo）
+        self.fixed_frame_skip = frame_skip
+        self.set_turbo(turbo)
+        super().__init__(board='bit', weights=weights)
+        # 后台进程结合预览方块做前瞻，重复局面走缓存；
+        # 新方块出现后最多等两帧，帧循环本身不做搜索
+        self.planner = Planner(2 / FPS, depth=LOOKAHEAD, beam_width=BEAM_WIDTH, board='bit',
+                               cache_size=65536, weights=weights)
+        self.font = pygame.font.SysFont('consolas', 24)
+        self.profiler = profiler or make_profiler()
+        if self.profiler.overlay:
+            self.small_font = pygame.font.SysFont('consolas', 14)
+        self.renderer = Renderer(self.screen, BLOCK_SIZE, BORDER, COLORS, WIDTH, HEIGHT)
+        self.renderer.set_background(self.renderer.draw_background(PREVIEW_BOX))
+
+    def set_turbo(self, turbo):
+        self.turbo = turbo
+        self.frame_skip = self.fixed_frame_skip or (4 if turbo else 1)
         self.move_sequence = []
-        self.reset_game()
-
-    def reset_game(self):
-        self.game_board = [[0]*WIDTH for _ in range(HEIGHT)]
-        self.score = 0
-        self.current_piece = self.new_piece()
-        self.next_piece = self.new_piece()
-        self.game_over = False
-        self.last_drop = time.time()
-
-    def new_piece(self):
-        shape_data = random.choice(SHAPES)
-        return {
-            "shape": shape_data["shape"],
-            "preview_offset": shape_data["preview_offset"],
-            "color": random.randint(1, len(COLORS)-1),
-            "x": WIDTH//2 - len(shape_data["shape"][0])//2,
-            "y": 0
-        }
-
-    def check_collision(self, piece, dx=0, dy=0):
-        for y, row in enumerate(piece['shape']):
-            for x, cell in enumerate(row):
-                if cell:
-                    new_x = piece['x'] + x + dx
-                    new_y = piece['y'] + y + dy
-                    if new_x < 0 or new_x >= WIDTH or new_y >= HEIGHT:
-                        return True
-                    if new_y >= 0 and self.game_board[new_y][new_x]:
-                        return True
-        return False
 
-    def rotate_piece(self):
-        rotated = [list(row) for row in zip(*reversed(self.current_piece['shape']))]
-        old_shape = self.current_piece['shape']
-        self.current_piece['shape'] = rotated
-        if self.check_collision(self.current_piece):
-            self.current_piece['shape'] = old_shape
-
-    def lock_piece(self):
-        for y, row in enumerate(self.current_piece['shape']):
-            for x, cell in enumerate(row):
-                if cell:
-                    self.game_board[y + self.current_piece['y']][x + self.current_piece['x']] = self.current_piece['color']
-        
-        lines_cleared = 0
-        for y in range(HEIGHT):
-            if 0 not in self.game_board[y]:
-                del self.game_board[y]
-                self.game_board.insert(0, [0]*WIDTH)
-                lines_cleared += 1
-        
-        if lines_cleared > 0:
-            self.score += 100 * (2 ** lines_cleared)
-
-    def draw_block(self, x, y, color, is_preview=False):
-        border = BORDER * 2 if is_preview else BORDER
-        pygame.draw.rect(self.screen, COLORS[color],
-                        (x*BLOCK_SIZE + border, y*BLOCK_SIZE + border,
-                         BLOCK_SIZE - 2*border, BLOCK_SIZE - 2*border))
-        if color != 0:
-            pygame.draw.line(self.screen, (255,255,255), 
-                            (x*BLOCK_SIZE, y*BLOCK_SIZE),
-                            (x*BLOCK_SIZE + BLOCK_SIZE, y*BLOCK_SIZE), 2)
-            pygame.draw.line(self.screen, (255,255,255),
-                            (x*BLOCK_SIZE, y*BLOCK_SIZE),
-                            (x*BLOCK_SIZE, y*BLOCK_SIZE + BLOCK_SIZE), 2)
-
-    def evaluate_position(self, piece):
-        temp = [row.copy() for row in self.game_board]
-        max_height = 0
-        wells = 0
-        holes = 0
-        bumpiness = 0
-        
-        for y, row in enumerate(piece['shape']):
-            for x, cell in enumerate(row):
-                if cell:
-                    ty = y + piece['y']
-                    tx = x + piece['x']
-                    if 0 <= tx < WIDTH and 0 <= ty < HEIGHT:
-                        temp[ty][tx] = piece['color']
-        
-        heights = []
-        for x in range(WIDTH):
-            height = 0
-            for y in range(HEIGHT):
-                if temp[y][x]:
-                    height = HEIGHT - y
-                    break
-            heights.append(height)
-            max_height = max(max_height, height)
-            
-            has_block = False
-            for y in range(HEIGHT):
-                if temp[y][x]:
-                    has_block = True
-                elif has_block:
-                    holes += 1
-        
-        for x in range(WIDTH):
-            left = heights[x-1] if x > 0 else 100
-            right = heights[x+1] if x < WIDTH-1 else 100
-            wells += max(0, min(left, right) - heights[x])
-        
-        bumpiness = sum(abs(heights[i] - heights[i+1]) for i in range(WIDTH-1))
-        full_lines = sum(1 for row in temp if 0 not in row)
-        
-        return (
-            full_lines ** 2.5 * 1000
-            - holes * 300
-            - wells * 50
-            - bumpiness * 10
-            - max_height * 5
-        )
-
-    def ai_think(self):
-        best = {'score': -float('inf'), 'moves': []}
-        original = copy.deepcopy(self.current_piece)
-
-        for rotate in range(4):
-            piece = copy.deepcopy(original)
-            for _ in range(rotate):
-                piece['shape'] = [list(row) for row in zip(*reversed(piece['shape']))]
-            
-            min_x = -len(piece['shape'][0]) + 1
-            max_x = WIDTH - 1
-            
-            for x in range(min_x, max_x):
-                test = copy.deepcopy(piece)
-                test['x'] = x
-                
-                while not self.check_collision(test, dy=1):
-                    test['y'] += 1
-                
-                if not self.check_collision(test):
-                    score = self.evaluate_position(test)
-                    if score > best['score']:
-                        moves = self.generate_moves(original, test, rotate)
-                        best = {'score': score, 'moves': moves}
-        return best['moves']
-
-    def generate_moves(self, original, target, rotations):
-        moves = []
-        if rotations in (1, 3):
-            moves += ['rotate'] * rotations
-        elif rotations == 2:
-            moves += ['rotate', 'rotate']
-        
-        dx = target['x'] - original['x']
-        if dx != 0:
-            direction = 'right' if dx > 0 else 'left'
-            moves += [direction] * abs(dx)
-        
-        moves.append('drop')
-        return moves
+    def simulate(self, wait_until=None):
+        # 一个模拟步：普通模式执行一个操作，加速模式在主循环里直接算出并放下一整块。
+        # 规划进程还没给出走法时不推进，返回 False；wait_until 为最多等到的时刻
+        if self.turbo:
+            start = time.perf_counter()
+            best = beam_search(self, LOOKAHEAD, BEAM_WIDTH)
+            self.profiler.record('ai_think', start, time.perf_counter())
+            if best is None:
+                self.end_game()
+            else:
+                self.place(*best)
+            return True
+        if not self.move_sequence:
+            moves = self.planner.moves_for(self, wait_until)
+            if moves is None:
+                return False
+            # 拿到操作序列时记一次这块方块的 ai_think：规划进程实际的搜索耗时，
+            # 而不是这里取结果的时间
+            if self.planner.think_time is not None:
+                end = time.perf_counter()
+                self.profiler.record('ai_think', end - self.planner.think_time, end)
+            if not moves:
+                # 无处可放：与加速模式一样结束本局
+                self.end_game()
+                return True
+            self.move_sequence = moves
+        self.step(self.move_sequence.pop(0))
+        return True
 
     def run(self):
+        # 固定步长：模拟按 FPS * speed 步/秒推进，与渲染帧率无关；
+        # 一帧内模拟最多占用一帧的时间，追不上时丢弃积压，避免越落越远
+        profiler = self.profiler
+        frame_time = 1 / FPS
+        frame = 0
+        lag = 0.0
         while True:
+            profiler.begin_frame()
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
+                    self.planner.close()
                     pygame.quit()
+                    profiler.close()
                     return
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_r:
-                        self.reset_game()
-
-            if self.ai_mode and not self.game_over:
-                if not self.move_sequence:
-                    self.move_sequence = self.ai_think()
-                if self.move_sequence:
-                    action = self.move_sequence.pop(0)
-                    if action == 'rotate':
-                        self.rotate_piece()
-                    elif action == 'left' and not self.check_collision(self.current_piece, dx=-1):
-                        self.current_piece['x'] -= 1
-                    elif action == 'right' and not self.check_collision(self.current_piece, dx=1):
-                        self.current_piece['x'] += 1
-                    elif action == 'drop':
-                        while not self.check_collision(self.current_piece, dy=1):
-                            self.current_piece['y'] += 1
-                        self.lock_piece()
-                        self.current_piece = self.next_piece
-                        self.next_piece = self.new_piece()
-                        if self.check_collision(self.current_piece):
-                            self.game_over = True
+                        self.reset()
+                        self.planner.reset()
+                        self.renderer.invalidate()
+                    elif event.key == pygame.K_t:
+                        self.set_turbo(not self.turbo)
+            profiler.mark('events')
+
+            if self.ai_mode:
+                step_time = frame_time / self.speed
+                deadline = time.perf_counter() + frame_time
+                # 每帧多于一步时，规划进程还没给出走法就在本帧内等它；
+                # 等不到则保留积压（最多一帧），下一帧接着推进
+                wait_until = deadline if self.speed > 1 else None
+                while lag >= step_time and not self.game_over:
+                    if not self.simulate(wait_until):
+                        lag = min(lag, frame_time)
+                        break
+                    lag -= step_time
+                    if time.perf_counter() > deadline:
+                        lag = 0.0
+                if self.game_over:
+                    lag = 0.0
+                profiler.mark('sim')
+
+            frame += 1
+            if frame % self.frame_skip:
+                lag += self.clock.tick(FPS) / 1000
+                profiler.mark('tick')
+                profiler.end_frame()
+                continue
+
+            # 只重画变化的部分
+            self.renderer.draw_preview(self.next_piece, PREVIEW_X, PREVIEW_Y, PREVIEW_BOX)
+            self.renderer.draw_board(self.game_board, None if self.game_over else self.current_piece)
+            self.renderer.text('score', f'Score: {self.score}', self.font, (BLOCK_SIZE*(WIDTH+1), 20))
 
-            self.screen.fill(COLORS[0])
-            
-            # 绘制游戏区域边框
-            pygame.draw.rect(self.screen, (100,100,100), 
-                           (0, 0, BLOCK_SIZE*WIDTH, BLOCK_SIZE*HEIGHT), 3)
-            
-            # 绘制下一个方块预览
-            preview_x = WIDTH + 2
-            preview_y = 6
-            pygame.draw.rect(self.screen, (80,80,80), 
-                           (preview_x*BLOCK_SIZE-10, preview_y*BLOCK_SIZE-10, 
-                            PREVIEW_SIZE+20, PREVIEW_SIZE+20), 0)
-            ox, oy = self.next_piece['preview_offset']
-            for y, row in enumerate(self.next_piece['shape']):
-                for x, cell in enumerate(row):
-                    if cell:
-                        self.draw_block(
-                            preview_x + x + ox, 
-                            preview_y + y + oy, 
-                            self.next_piece['color'], 
-                            is_preview=True
-                        )
-            
-            # 绘制游戏板
-            for y in range(HEIGHT):
-                for x in range(WIDTH):
-                    if self.game_board[y][x]:
-                        self.draw_block(x, y, self.game_board[y][x])
-            
-            # 绘制当前方块
-            if not self.game_over:
-                for y, row in enumerate(self.current_piece['shape']):
-                    for x, cell in enumerate(row):
-                        if cell:
-                            self.draw_block(x + self.current_piece['x'], 
-                                         y + self.current_piece['y'], 
-                                         self.current_piece['color'])
-            
-            # 绘制分数
-            font = pygame.font.SysFont('consolas', 24)
-            score_text = font.render(f'Score: {self.score}', True, (255,255,255))
-            self.screen.blit(score_text, (BLOCK_SIZE*(WIDTH+1), 20))
-            
             # 游戏结束提示
             if self.game_over:
-                over_text = font.render('Game Over - Press R to Restart', True, (255,255,255))
-                self.screen.blit(over_text, (BLOCK_SIZE, BLOCK_SIZE*HEIGHT//2))
-            
-            pygame.display.update()
-            self.clock.tick(FPS)
+                self.renderer.text('over', 'Game Over - Press R to Restart', self.font,
+                                   (BLOCK_SIZE, BLOCK_SIZE*HEIGHT//2))
+
+            if profiler.overlay:
+                for i, line in enumerate(profiler.overlay_lines()):
+                    self.renderer.text(f'profile{i}', line, self.small_font,
+                                       (BLOCK_SIZE*(WIDTH+1), 55 + i*16), (180,180,180))
+            profiler.mark('draw')
+
+            self.renderer.update()
+            profiler.mark('update')
+            lag += self.clock.tick(FPS) / 1000
+            profiler.mark('tick')
+            profiler.end_frame()
 
 if __name__ == '__main__':
-    game = Tetris(ai_mode=True)
-    game.run()
+    parser = argparse.ArgumentParser(description='AI Tetris')
+    parser.add_argument('weights', nargs='?', help='tune.py 调出的权重文件')
+    parser.add_argument('--profile', action='store_true', help='逐帧分阶段计时，退出时打印摘要')
+    parser.add_argument('--overlay', action='store_true', help='在分数下方显示各阶段耗时')
+    parser.add_argument('--trace', help='退出时写出 Chrome trace 文件')
+    parser.add_argument('--speed', type=float, default=1, help='每帧推进的模拟步数')
+    parser.add_argument('--turbo', action='store_true', help='加速模式：每个模拟步放下一整块（运行中按 T 切换）')
+    parser.add_argument('--frame-skip', type=int, help='每隔几帧渲染一次')
+    parser.add_argument('--record', help='退出（包括异常退出）时把当前这局存为重放文件')
+    parser.add_argument('--spectate', help='开放观战（主机:端口 或 Unix 套接字路径），见 spectate.py')
+    args = parser.parse_args()
+    game = Tetris(ai_mode=True, weights=args.weights,
+                  profiler=make_profiler(args.profile, args.overlay, args.trace),
+                  speed=args.speed, turbo=args.turbo, frame_skip=args.frame_skip)
+    spectators = None
+    if args.spectate:
+        from spectate import Spectators
+        spectators = Spectators(args.spectate)
+        spectators.attach(game)
+    try:
+        game.run()
+    finally:
+        if args.record:
+            replay.save(args.record, game)
+        if spectators is not None:
+            spectators.close()
@@ -0,0 +1,520 @@
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+from board import BOARDS
+from engine import HEIGHT, ROTATIONS, SHAPES, WIDTH, Piece, TetrisEngine
+import replay
+
+# 基准测试：python bench.py [--quick] [--output results.json] [--baseline baseline.json]
+# 指标名以 _per_s 结尾的越大越好，以 _ms、_us 结尾的越小越好。
+# 指定 --baseline 时与之前保存的结果逐项比较，有退步或核对失败时退出码为 1。
+
+# 固定盘面：'#' 为方块，'.' 为空格，自底向上排列在棋盘最下面
+FIXED_BOARDS = {
+    'empty': [],
+    'flat': [
+        '#########.',
+        '#########.',
+        '#########.',
+        '#########.',
+    ],
+    'holes': [
+        '.##..##.#.',
+        '###.####.#',
+        '#.#######.',
+        '####.#####',
+        '##.######.',
+        '#########.',
+    ],
+    'tall': [
+        '.#........',
+        '.##.......',
+        '.##....#..',
+        '###..#.##.',
+        '####.#.##.',
+        '####.####.',
+        '#######.##',
+        '########.#',
+        '##.#######',
+        '#########.',
+        '.#########',
+        '####.#####',
+    ],
+}
+
+# 随机盘面与渲染测试用的填充比例
+FILL_LEVELS = (0.0, 0.25, 0.5, 0.75)
+
+# 棋盘尺寸扩展测试：(宽, 高)
+SCALING_SIZES = ((10, 20), (40, 100), (100, 1000), (300, 5000), (10, 5000))
+
+
+def board_from_rows(board_type, rows, width=WIDTH, height=HEIGHT):
+    # 逐格锁定 1x1 方块，增量统计与哈希和正常对局一样保持一致
+    board = BOARDS[board_type](width, height)
+    top = height - len(rows)
+    for y, row in enumerate(rows):
+        for x, cell in enumerate(row):
+            if cell == '#':
+                board.lock(((1,),), x, top + y, 1 + (x + y) % 7)
+    return board
+
+
+def random_rows(seed, count, width=WIDTH):
+    # count 行约七成有方块，每行至少留一个空格，不会被消掉
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        row = ['#' if rng.random() < 0.7 else '.' for _ in range(width)]
+        row[rng.randrange(width)] = '.'
+        rows.append(''.join(row))
+    return rows
+
+
+def fixtures(board_type, seed=1):
+    boards = {name: board_from_rows(board_type, rows) for name, rows in FIXED_BOARDS.items()}
+    for fill in FILL_LEVELS[1:]:
+        rows = random_rows(seed, int(HEIGHT * fill))
+        boards[f'random{int(fill * 100)}'] = board_from_rows(board_type, rows)
+    return boards
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def bench_collisions(boards, repeat):
+    # 每个盘面上，每种方块的每个旋转状态在一排位置上各测一次（含越界位置）
+    probes = [(state.shape, x, y)
+              for states in ROTATIONS for state in states
+              for x in range(-1, WIDTH - state.width + 2)
+              for y in range(0, HEIGHT - state.height + 1, 3)]
+    calls = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for board in boards.values():
+            collides = board.collides
+            for shape, x, y in probes:
+                collides(shape, x, y)
+            calls += len(probes)
+    return calls / (time.perf_counter() - start)
+
+
+def bench_evaluations(board_type, boards, repeat):
+    # 每个盘面上对每种方块的全部候选落点打分
+    engine = TetrisEngine(board=board_type)
+    count = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for board in boards.values():
+            for kind in range(len(SHAPES)):
+                for _, state, x, y in engine.candidates(kind, board):
+                    engine.evaluate_placement(state.shape, x, y, board)
+                    count += 1
+    return count / (time.perf_counter() - start)
+
+
+def bench_ai_latency(options, seed, pieces):
+    # 逐块计时 ai_think，再按生成的操作序列下完这一块
+    engine = TetrisEngine(seed=seed, **options)
+    latencies = []
+    while not engine.game_over and len(latencies) < pieces:
+        start = time.perf_counter()
+        moves = engine.ai_think()
+        latencies.append((time.perf_counter() - start) * 1000)
+        if not moves:
+            break
+        for move in moves:
+            if engine.step(move):
+                break
+    return percentile(latencies, 0.5), percentile(latencies, 0.99)
+
+
+def bench_games(options, seeds, max_pieces):
+    pieces = 0
+    start = time.perf_counter()
+    for seed in seeds:
+        pieces += TetrisEngine(seed=seed, **options).play(max_pieces=max_pieces)
+    return pieces / (time.perf_counter() - start)
+
+
+def bench_cache(options, seed, max_pieces):
+    # 前瞻搜索下评估缓存的命中率（固定种子，结果是确定的）
+    engine = TetrisEngine(seed=seed, **options)
+    engine.play(max_pieces=max_pieces)
+    return engine.cache.stats()['hit_rate']
+
+
+def bench_vec_env(n, steps):
+    # 向量化多局环境每秒推进的方块数（随机动作，结束的对局立即重开）
+    import numpy as np
+    from vec_env import VecEnv
+    env = VecEnv(n, seed=1)
+    rng = np.random.default_rng(1)
+    actions = [(rng.integers(0, 4, n), rng.integers(0, WIDTH - 1, n)) for _ in range(steps)]
+    start = time.perf_counter()
+    for rotations, xs in actions:
+        env.step(rotations, xs)
+        env.reset(env.game_over)
+    return n * steps / (time.perf_counter() - start)
+
+
+def bench_scaling(repeat):
+    # 不同棋盘尺寸下的单次打分、消行、复制与整局速度。
+    # 打分、消行应与尺寸基本无关（消行要更新每列高度，随宽度增长）；
+    # 整局速度随宽度下降（候选落点数与宽度成正比），不应随高度下降，
+    # 10x5000 用来确认落下方块不是逐行试探
+    vertical_i = ROTATIONS[0][1].shape
+    results = {}
+    for width, height in SCALING_SIZES:
+        name = f'scale.{width}x{height}'
+        # 底部 4 行只差最右一格，其上 min(高/2, 64) 行随机方块
+        rows = random_rows(1, min(height // 2, 64), width) + ['#' * (width - 1) + '.'] * 4
+        board = board_from_rows('bit', rows, width, height)
+        engine = TetrisEngine(board='bit', width=width, height=height)
+
+        count = 0
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for kind in range(len(SHAPES)):
+                for _, state, x, y in engine.candidates(kind, board):
+                    engine.evaluate_placement(state.shape, x, y, board)
+                    count += 1
+        results[f'{name}.evaluations_per_s'] = count / (time.perf_counter() - start)
+
+        copies = 200 * repeat
+        start = time.perf_counter()
+        for _ in range(copies):
+            board.copy()
+        results[f'{name}.copy_us'] = (time.perf_counter() - start) * 1e6 / copies
+
+        # 竖 I 填进最右一列，一次消掉 4 行，上面的行整体下移（含一次复制）
+        start = time.perf_counter()
+        for _ in range(copies):
+            board.copy().lock(vertical_i, width - 1, height - 4, 1)
+        results[f'{name}.clear_us'] = (time.perf_counter() - start) * 1e6 / copies
+
+        # 同样的消行在原棋盘上试放后撤销（搜索的做法），不复制棋盘
+        start = time.perf_counter()
+        for _ in range(copies):
+            board.push()
+            board.lock(vertical_i, width - 1, height - 4, 1)
+            board.pop()
+        results[f'{name}.trial_us'] = (time.perf_counter() - start) * 1e6 / copies
+
+        pieces = 0
+        start = time.perf_counter()
+        for seed in range(repeat):
+            pieces += TetrisEngine(board='bit', seed=seed, width=width, height=height).play(50)
+        results[f'{name}.pieces_per_s'] = pieces / (time.perf_counter() - start)
+    return results
+
+
+def bench_render(frames):
+    # SDL 虚拟显示驱动下各填充比例的每帧耗时：整屏重画与只画变化格子
+    if importlib.util.find_spec('pygame') is None:
+        print('render: 未安装 pygame，跳过')
+        return {}
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    from render import Renderer
+    from Test import BLOCK_SIZE, BORDER, COLORS
+
+    pygame.init()
+    screen = pygame.display.set_mode((BLOCK_SIZE*(WIDTH+7), BLOCK_SIZE*HEIGHT))
+    renderer = Renderer(screen, BLOCK_SIZE, BORDER, COLORS, WIDTH, HEIGHT)
+    results = {}
+    for fill in FILL_LEVELS:
+        cells = board_from_rows('list', random_rows(1, int(HEIGHT * fill))).cells
+        for mode in ('full', 'incremental'):
+            renderer.invalidate()
+            start = time.perf_counter()
+            for frame in range(frames):
+                if mode == 'full':
+                    renderer.invalidate()
+                renderer.draw_board(cells, Piece(2, 0, 4, frame % 4, 3))
+                renderer.update()
+            results[f'render.{mode}.fill{int(fill * 100)}_ms'] = \
+                (time.perf_counter() - start) * 1000 / frames
+    pygame.quit()
+    return results
+
+
+def reference_features(cells, shape, px, py):
+    # 原始的整盘重扫算法，用来核对增量特征
+    width, height = len(cells[0]), len(cells)
+    temp = [row.copy() for row in cells]
+    for y, row in enumerate(shape):
+        for x, cell in enumerate(row):
+            if cell:
+                temp[y + py][x + px] = 1
+    heights = []
+    holes = 0
+    for x in range(width):
+        column = [temp[y][x] for y in range(height)]
+        top = next((y for y, cell in enumerate(column) if cell), height)
+        heights.append(height - top)
+        holes += sum(1 for cell in column[top:] if not cell)
+    wells = 0
+    for x in range(width):
+        left = heights[x-1] if x > 0 else height
+        right = heights[x+1] if x < width-1 else height
+        wells += max(0, min(left, right) - heights[x])
+    bumpiness = sum(abs(heights[i] - heights[i+1]) for i in range(width-1))
+    full_lines = sum(1 for row in temp if 0 not in row)
+    return full_lines, holes, wells, bumpiness, max(heights)
+
+
+def check_features(board_type, seed=1, max_pieces=200):
+    # 对局中每一步都把所有候选落点的增量特征与整盘重扫结果比对
+    engine = TetrisEngine(board=board_type, seed=seed)
+    mismatches = 0
+    for _ in range(max_pieces):
+        if engine.game_over:
+            break
+        for _, state, x, y in engine.candidates(engine.current_piece.kind):
+            expected = reference_features(engine.game_board, state.shape, x, y)
+            if engine.board.features(state.shape, x, y) != expected:
+                mismatches += 1
+        best = engine.ai_search()
+        if best is None:
+            break
+        engine.place(*best)
+    return mismatches
+
+
+def board_state(board):
+    # 棋盘内容与全部增量统计的快照，用于比较
+    state = {name: getattr(board, name)
+             for name in ('zobrist', 'holes', 'wells', 'bumpiness', 'max_height')}
+    for name in ('col_heights', 'col_holes', 'row_fill', 'row_sums'):
+        state[name] = getattr(board, name).copy()
+    state['cells'] = [row.copy() for row in board.cells]
+    if hasattr(board, 'rows'):
+        state['rows'] = board.rows.copy()
+    return state
+
+
+def check_undo(board_type, seed=1, max_pieces=100):
+    # 每一步 push 后连续锁定三块（能消行就消行，中间再嵌套一次 push/pop），
+    # pop 后棋盘与统计必须和 push 前完全一样；从底部几乎填满的盘面开始，保证有消行
+    engine = TetrisEngine(board=board_type, seed=seed)
+    engine.board = board_from_rows(board_type, FIXED_BOARDS['flat'])
+    rng = random.Random(seed)
+    mismatches = 0
+    for _ in range(max_pieces):
+        if engine.game_over:
+            break
+        board = engine.board
+        before = board_state(board)
+        board.push()
+        for level in range(3):
+            found = list(engine.candidates(rng.randrange(len(SHAPES))))
+            if not found:
+                break
+            _, state, x, y = max(found, key=lambda c: board.full_lines(c[1].shape, c[2], c[3]))
+            if level == 1:
+                inner = board_state(board)
+                board.push()
+                board.lock(state.shape, x, y, 1)
+                board.pop()
+                mismatches += board_state(board) != inner
+            board.lock(state.shape, x, y, 1 + level)
+        board.pop()
+        mismatches += board_state(board) != before or board.journal is not None
+        best = engine.ai_search()
+        if best is None:
+            break
+        engine.place(*best)
+    return mismatches
+
+
+def check_replay(seed=1, max_pieces=100):
+    # 按 ai_think 的操作序列逐步下一局（每块先受一次重力下落），
+    # 存成重放文件再重算，得分与棋盘必须和原局一致
+    engine = TetrisEngine(board='list', seed=seed)
+    while not engine.game_over and engine.pieces < max_pieces:
+        moves = engine.ai_think()
+        if not moves:
+            break
+        for move in ['down'] + moves:
+            if engine.step(move):
+                break
+    replayed = replay.replay(replay.loads(replay.dumps(engine)))
+    return (replayed.score, replayed.game_board) == (engine.score, engine.game_board)
+
+
+def check_vec_env(n=64, seed=1, max_pieces=100):
+    # VecEnv 与 TetrisEngine.place 用同样的方块和随机动作（含越界的列）各下 n 局，
+    # 每步比较棋盘、得分与结束标记，返回不一致的次数。
+    # 一半对局从半满的随机盘面开始，最顶行另有一格悬空方块：这一列的列高到顶，
+    # 经过它的落点要逐行试探（方块从它下面的空格落下）
+    import numpy as np
+    from vec_env import VecEnv
+    env = VecEnv(n, seed=seed)
+    engines = [TetrisEngine(board='bit', seed=seed + i) for i in range(n)]
+    for i, engine in enumerate(engines[::2]):
+        engine.board = board_from_rows('bit', random_rows(seed + i, HEIGHT // 2))
+        engine.board.lock(((1,),), i % WIDTH, 0, 1)
+        env.boards[2*i] = engine.game_board
+    rng = np.random.default_rng(seed)
+    mismatches = 0
+    for _ in range(max_pieces):
+        if env.game_over.all():
+            break
+        rotations = rng.integers(0, 4, n)
+        xs = rng.integers(-1, WIDTH, n)
+        for i, engine in enumerate(engines):
+            # 引擎的当前/预览方块换成 VecEnv 抽到的，两边才能比较
+            kinds = env.kinds[i], env.next_kinds[i]
+            colors = env.colors[i], env.next_colors[i]
+            engine.current_piece, engine.next_piece = (
+                Piece(int(kind), 0, int(env.spawn_x[kind]), 0, int(color))
+                for kind, color in zip(kinds, colors))
+            engine.place(int(rotations[i]), int(xs[i]))
+        env.step(rotations, xs)
+        for i, engine in enumerate(engines):
+            mismatches += (engine.game_over != env.game_over[i] or engine.score != env.scores[i]
+                           or not np.array_equal(np.array(engine.game_board), env.boards[i]))
+    return mismatches
+
+
+def final_state(seed, max_pieces, **options):
+    engine = TetrisEngine(seed=seed, **options)
+    engine.play(max_pieces=max_pieces)
+    return engine.score, engine.game_board
+
+
+def run_checks(max_pieces):
+    # 相同种子下各后端、各打分方式必须走出完全相同的对局
+    problems = []
+    reference = final_state(1, max_pieces, board='list')
+    if final_state(1, max_pieces, board='bit') != reference:
+        problems.append('bit 后端与 list 后端结果不一致')
+    if importlib.util.find_spec('numpy') is not None:
+        if final_state(1, max_pieces, board='bit', evaluator='numpy') != reference:
+            problems.append('numpy 批量打分与逐个打分结果不一致')
+        mismatches = check_vec_env(max_pieces=max_pieces)
+        if mismatches:
+            problems.append(f'VecEnv 有 {mismatches} 处与 TetrisEngine.place 结果不一致')
+    for board_type in BOARDS:
+        mismatches = check_features(board_type, max_pieces=max_pieces)
+        if mismatches:
+            problems.append(f'{board_type} 增量特征有 {mismatches} 处与整盘重扫不一致')
+        mismatches = check_undo(board_type, max_pieces=max_pieces)
+        if mismatches:
+            problems.append(f'{board_type} 有 {mismatches} 次 pop() 没有恢复棋盘')
+    if not check_replay(max_pieces=max_pieces):
+        problems.append('逐步操作的对局经重放文件往返后结果不一致')
+    return problems
+
+
+def run_suite(quick):
+    repeat = 1 if quick else 5
+    seeds = range(2 if quick else 5)
+    max_pieces = 100 if quick else 300
+    results = {}
+    for board_type in BOARDS:
+        boards = fixtures(board_type)
+        results[f'{board_type}.collisions_per_s'] = bench_collisions(boards, repeat)
+        results[f'{board_type}.evaluations_per_s'] = bench_evaluations(board_type, boards, repeat)
+
+    # 前瞻搜索慢得多，少下几块
+    configs = {
+        'greedy': ({'board': 'bit'}, max_pieces),
+        'lookahead': ({'board': 'bit', 'depth': 2, 'cache_size': 65536}, max_pieces // 5),
+    }
+    if importlib.util.find_spec('numpy') is not None:
+        configs['numpy'] = ({'board': 'bit', 'evaluator': 'numpy'}, max_pieces)
+    for name, (options, pieces) in configs.items():
+        p50, p99 = bench_ai_latency(options, 1, pieces)
+        results[f'ai.{name}.p50_ms'] = p50
+        results[f'ai.{name}.p99_ms'] = p99
+        results[f'game.{name}.pieces_per_s'] = bench_games(options, seeds, pieces)
+    options, pieces = configs['lookahead']
+    results['ai.lookahead.cache_hit_rate'] = bench_cache(options, 1, pieces)
+    if 'numpy' in configs:
+        results['vec_env.pieces_per_s'] = bench_vec_env(4096, 20 if quick else 100)
+
+    results.update(bench_scaling(repeat))
+    results.update(bench_render(60 if quick else 300))
+    return results
+
+
+def best_of(runs):
+    # 多轮结果取最好的一次，减少机器抖动对比较的影响
+    best = dict(runs[0])
+    for results in runs[1:]:
+        for name, value in results.items():
+            pick = min if name.endswith(('_ms', '_us')) else max
+            best[name] = pick(best[name], value)
+    return best
+
+
+def compare(results, baseline, threshold):
+    # 打印与基线的相对变化（正数为变好），返回退步超过阈值的指标名
+    regressions = []
+    for name, value in results.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        change = (value - old) / old
+        if name.endswith(('_ms', '_us')):
+            change = -change
+        flag = ''
+        if change < -threshold:
+            flag = '  !! 退步'
+            regressions.append(name)
+        print(f'{name:<32} {old:>14,.3f} -> {value:>14,.3f}  {change:+7.1%}{flag}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='引擎、AI 与渲染热点的基准测试')
+    parser.add_argument('--quick', action='store_true', help='减少迭代次数')
+    parser.add_argument('--output', help='把结果写成 JSON')
+    parser.add_argument('--baseline', help='与之前保存的 JSON 结果比较')
+    parser.add_argument('--threshold', type=float, default=0.1, help='判定退步的相对变化')
+    parser.add_argument('--rounds', type=int, default=3, help='整套测试重复几轮，取最好成绩')
+    parser.add_argument('--no-checks', action='store_true', help='跳过正确性核对')
+    args = parser.parse_args()
+
+    problems = [] if args.no_checks else run_checks(100 if args.quick else 300)
+    for problem in problems:
+        print(f'!! {problem}')
+
+    results = best_of([run_suite(args.quick) for _ in range(args.rounds)])
+    for name, value in results.items():
+        print(f'{name:<32} {value:>14,.3f}')
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'quick': args.quick,
+                'rounds': args.rounds,
+                'results': results,
+            }, f, indent=2)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        print(f'\n与 {args.baseline} 比较：')
+        regressions = compare(results, baseline, args.threshold)
+
+    if problems or regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,442 @@
+import random
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def shape_masks(shape):
+    # 每行方块转换成整数位掩码，第 x 列对应 1 << x
+    return tuple(sum(1 << x for x, cell in enumerate(row) if cell) for row in shape)
+
+
+@lru_cache(maxsize=None)
+def shape_columns(shape):
+    # 每列中有方块的行号（从上到下）
+    return tuple(tuple(y for y, row in enumerate(shape) if row[x])
+                 for x in range(len(shape[0])))
+
+
+@lru_cache(maxsize=None)
+def shape_row_counts(shape):
+    return tuple(sum(1 for cell in row if cell) for row in shape)
+
+
+@lru_cache(maxsize=None)
+def shape_cells(shape):
+    return tuple((x, y) for y, row in enumerate(shape) for x, cell in enumerate(row) if cell)
+
+
+MASK64 = (1 << 64) - 1
+
+
+@lru_cache(maxsize=None)
+def zobrist_keys(width, height):
+    # 每列、每行各一个 64 位随机数（行取奇数），格子 (x, y) 的键为两者之积，
+    # 棋盘哈希为所有方块格键之和（模 2^64）。这样只需 O(宽+高) 个随机数，
+    # 并且整行下移时只要按行重新加权，不必逐格重算。固定种子，不占用全局 random
+    rng = random.Random(0x7E7215)
+    col_keys = [rng.getrandbits(64) for _ in range(width)]
+    row_keys = [rng.getrandbits(64) | 1 for _ in range(height)]
+    return col_keys, row_keys
+
+
+def compact_rows(rows, full, empty):
+    # 原地删掉满行并在顶部补上空行，列表整体移动由 C 层完成
+    for y in sorted(full, reverse=True):
+        del rows[y]
+    rows[0:0] = [empty() if callable(empty) else empty for _ in full]
+
+
+def _surface(padded):
+    # padded 两端是邻列（或边界），只统计中间各列
+    wells = 0
+    bumpiness = 0
+    for i in range(1, len(padded) - 1):
+        h = padded[i]
+        low = min(padded[i-1], padded[i+1])
+        if low > h:
+            wells += low - h
+        if i < len(padded) - 2:
+            bumpiness += abs(h - padded[i+1])
+    return wells, bumpiness
+
+
+class Board:
+    """两种棋盘后端共用的增量特征跟踪。
+
+    锁定方块和消行时同步维护每列高度、每列空洞数、每行已填格数，
+    以及井深、凹凸度、最高高度的总和和整盘的 Zobrist 哈希。评估候选
+    落点时只更新方块经过的几列，不复制棋盘。子类需提供 _filled(x, y)。
+    各项开销只与方块经过的行列、消行时移动的行数成正比，与棋盘大小无关
+    （消行时每列要更新高度，这部分与宽度成正比）。
+
+    push() 之后的每次锁定都会记下被改动的行、列和统计值，pop() 按相反顺序
+    撤销到对应的 push()。搜索试放方块时用它代替复制整个棋盘。子类需提供
+    _row_lists()，列出随行号存放、消行时一起压缩的各个列表。
+    """
+
+    def _reset_tracking(self):
+        self.col_keys, self.row_keys = zobrist_keys(self.width, self.height)
+        self.zobrist = 0
+        self.col_heights = [0] * self.width
+        self.col_holes = [0] * self.width
+        self.row_fill = [0] * self.height
+        self.row_sums = [0] * self.height  # 每行方块格的列键之和
+        self.holes = 0
+        self.wells = 0
+        self.bumpiness = 0
+        self.max_height = 0
+        self.journal = None
+        self.marks = []
+
+    def _copy_tracking(self, other):
+        self.col_keys, self.row_keys = other.col_keys, other.row_keys
+        self.zobrist = other.zobrist
+        self.col_heights = other.col_heights.copy()
+        self.col_holes = other.col_holes.copy()
+        self.row_fill = other.row_fill.copy()
+        self.row_sums = other.row_sums.copy()
+        self.holes = other.holes
+        self.wells = other.wells
+        self.bumpiness = other.bumpiness
+        self.max_height = other.max_height
+        self.journal = None
+        self.marks = []
+
+    def push(self):
+        # 开始（或嵌套）一段可撤销的锁定
+        if self.journal is None:
+            self.journal = []
+        self.marks.append(len(self.journal))
+
+    def pop(self):
+        # 撤销最近一次 push() 之后的所有锁定，开销与改动的行列数成正比
+        mark = self.marks.pop()
+        journal = self.journal
+        lists = self._row_lists()
+        while len(journal) > mark:
+            scalars, rows, cols, clear = journal.pop()
+            if clear is not None:
+                # 先把移动过的那段行整体换回，恢复到刚锁定、尚未消行的状态
+                top, low, saved, heights, holes = clear
+                for target, segment in zip(lists, saved):
+                    target[top:low] = segment
+                self.col_heights[:] = heights
+                self.col_holes[:] = holes
+            for y, values in rows:
+                for target, value in zip(lists, values):
+                    target[y] = value
+            for x, h, holes in cols:
+                self.col_heights[x] = h
+                self.col_holes[x] = holes
+            self.zobrist, self.holes, self.wells, self.bumpiness, self.max_height = scalars
+        if not self.marks:
+            self.journal = None
+
+    def _record_lock(self, shape, px, py):
+        # 锁定前记下方块经过的行、列和各项统计
+        lists = self._row_lists()
+        rows = [(py + dy, [target[py + dy] for target in lists])
+                for dy, count in enumerate(shape_row_counts(shape)) if count]
+        cols = [(px + c, self.col_heights[px + c], self.col_holes[px + c])
+                for c in range(len(shape[0]))]
+        scalars = (self.zobrist, self.holes, self.wells, self.bumpiness, self.max_height)
+        self.journal.append([scalars, rows, cols, None])
+
+    def _record_clear(self, full):
+        # 消行只移动原堆顶到最低满行之间的行，记下这一段；
+        # 消行会改动每列的高度，各列统计整体保存
+        top, low = self.height - self.max_height, max(full) + 1
+        self.journal[-1][3] = (top, low, [target[top:low] for target in self._row_lists()],
+                               self.col_heights.copy(), self.col_holes.copy())
+
+    def heights(self):
+        # 每列最高方块的高度，空列为 0（直接返回内部列表，勿修改）
+        return self.col_heights
+
+    def placement_hash(self, shape, px, py):
+        # 方块放在 (px, py) 后（消行前）棋盘的 Zobrist 哈希，只需加上方块的几个格子
+        col_keys, row_keys = self.col_keys, self.row_keys
+        h = self.zobrist
+        for x, y in shape_cells(shape):
+            h += col_keys[px + x] * row_keys[py + y]
+        return h & MASK64
+
+    def full_lines(self, shape, px, py):
+        # 方块放在 (px, py) 后会填满的行数
+        width = self.width
+        row_fill = self.row_fill
+        return sum(1 for dy, count in enumerate(shape_row_counts(shape))
+                   if count and row_fill[py + dy] + count == width)
+
+    def full_rows(self, shape, px, py):
+        # 方块放在 (px, py) 后会填满的行号（从上到下）
+        width = self.width
+        row_fill = self.row_fill
+        return [py + dy for dy, count in enumerate(shape_row_counts(shape))
+                if count and row_fill[py + dy] + count == width]
+
+    def _column_changes(self, shape, px, py):
+        # 方块放在 (px, py) 后各列的新高度与空洞变化量
+        height = self.height
+        col_heights = self.col_heights
+        new_heights = []
+        hole_deltas = []
+        for c, ys in enumerate(shape_columns(shape)):
+            h = col_heights[px + c]
+            if not ys:
+                new_heights.append(h)
+                hole_deltas.append(0)
+                continue
+            top = height - h
+            above = [py + y for y in ys if py + y < top]
+            # 落在原表面之下的格子填掉了空洞
+            delta = -(len(ys) - len(above))
+            if above:
+                # 新表面与原表面之间没被方块占据的格子变成空洞
+                delta += top - above[0] - len(above)
+                h = height - above[0]
+            new_heights.append(h)
+            hole_deltas.append(delta)
+        return new_heights, hole_deltas
+
+    def placed_heights(self, shape, px, py):
+        # 方块放在 (px, py) 后（消行前）每列的高度
+        new_heights, _ = self._column_changes(shape, px, py)
+        heights = self.col_heights.copy()
+        heights[px:px + len(new_heights)] = new_heights
+        return heights
+
+    def _surface_delta(self, x0, new_heights):
+        # 第 x0 列起若干列高度变化后，井深与凹凸度的变化量。
+        # 只看变化列及其左右邻列，两端用棋盘高度作边界
+        width = self.width
+        old = self.col_heights
+        end = x0 + len(new_heights)
+        lo = max(x0 - 1, 0)
+        hi = min(end + 1, width)
+        left = old[lo-1] if lo > 0 else self.height
+        right = old[hi] if hi < width else self.height
+        before = [left] + old[lo:hi] + [right]
+        after = before.copy()
+        after[x0 - lo + 1:end - lo + 1] = new_heights
+        wells_after, bump_after = _surface(after)
+        wells_before, bump_before = _surface(before)
+        return wells_after - wells_before, bump_after - bump_before
+
+    def features(self, shape, px, py):
+        # 假设方块放在 (px, py) 后的局面特征：
+        # (满行数, 空洞数, 井深和, 凹凸度, 最高高度)
+        new_heights, hole_deltas = self._column_changes(shape, px, py)
+        wells, bumpiness = self._surface_delta(px, new_heights)
+
+        return (
+            self.full_lines(shape, px, py),
+            self.holes + sum(hole_deltas),
+            self.wells + wells,
+            self.bumpiness + bumpiness,
+            max(self.max_height, max(new_heights)),
+        )
+
+    def _track_lock(self, shape, px, py):
+        # 锁定后更新统计，返回被填满的行号
+        new_heights, hole_deltas = self._column_changes(shape, px, py)
+        wells, bumpiness = self._surface_delta(px, new_heights)
+        self.wells += wells
+        self.bumpiness += bumpiness
+        for c, h in enumerate(new_heights):
+            self.col_heights[px + c] = h
+            self.col_holes[px + c] += hole_deltas[c]
+        self.holes += sum(hole_deltas)
+        self.max_height = max(self.max_height, max(new_heights))
+        self.zobrist = self.placement_hash(shape, px, py)
+
+        col_keys = self.col_keys
+        for x, y in shape_cells(shape):
+            self.row_sums[py + y] = (self.row_sums[py + y] + col_keys[px + x]) & MASK64
+        full = []
+        for dy, count in enumerate(shape_row_counts(shape)):
+            if count:
+                self.row_fill[py + dy] += count
+                if self.row_fill[py + dy] == self.width:
+                    full.append(py + dy)
+        return full
+
+    def _hash_rows(self, start, end):
+        row_keys, row_sums = self.row_keys, self.row_sums
+        return sum(row_keys[y] * row_sums[y] for y in range(start, end))
+
+    def _track_clear(self, full):
+        # 消行后（棋盘已压缩）更新统计。满行在每列都有方块，
+        # 所以各列高度先整体下降 len(full)，若原来的顶格被消掉，
+        # 再向下越过露出来的空洞找到新的顶格
+        n = len(full)
+        height = self.height
+        # 只有最低的满行及以上、原堆顶以下的行移动了位置，哈希只重算这一段
+        top, low = height - self.max_height, max(full) + 1
+        old = self._hash_rows(top, low)
+        compact_rows(self.row_fill, full, 0)
+        compact_rows(self.row_sums, full, 0)
+        self.zobrist = (self.zobrist - old + self._hash_rows(top, low)) & MASK64
+
+        for x in range(self.width):
+            r = height - self.col_heights[x] + n
+            skipped = 0
+            while r < height and not self._filled(x, r):
+                r += 1
+                skipped += 1
+            self.col_heights[x] = height - r
+            self.col_holes[x] -= skipped
+            self.holes -= skipped
+        self._recount_surface()
+
+    def _recount_surface(self):
+        heights = self.col_heights
+        width = self.width
+        wells = 0
+        for x in range(width):
+            left = heights[x-1] if x > 0 else self.height
+            right = heights[x+1] if x < width-1 else self.height
+            wells += max(0, min(left, right) - heights[x])
+        self.wells = wells
+        self.bumpiness = sum(abs(heights[i] - heights[i+1]) for i in range(width-1))
+        self.max_height = max(heights)
+
+
+class ListBoard(Board):
+    """原始实现：每行是一个颜色列表，逐格检查。"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.cells = [[0]*width for _ in range(height)]
+        self._reset_tracking()
+
+    def _filled(self, x, y):
+        return self.cells[y][x] != 0
+
+    def _row_lists(self):
+        return self.cells, self.row_fill, self.row_sums
+
+    def copy(self):
+        # 副本与原棋盘共用各行列表，锁定时先复制要写的行（写时复制）
+        board = ListBoard.__new__(ListBoard)
+        board.width, board.height = self.width, self.height
+        board.cells = self.cells.copy()
+        board._copy_tracking(self)
+        return board
+
+    def collides(self, shape, px, py):
+        for y, row in enumerate(shape):
+            for x, cell in enumerate(row):
+                if cell:
+                    new_x = px + x
+                    new_y = py + y
+                    if new_x < 0 or new_x >= self.width or new_y >= self.height:
+                        return True
+                    if new_y >= 0 and self.cells[new_y][new_x]:
+                        return True
+        return False
+
+    def lock(self, shape, px, py, color):
+        if self.journal is not None:
+            self._record_lock(shape, px, py)
+        cells = self.cells
+        for y, row in enumerate(shape):
+            target = cells[y + py] = cells[y + py].copy()
+            for x, cell in enumerate(row):
+                if cell:
+                    target[x + px] = color
+
+        full = self._track_lock(shape, px, py)
+        if full:
+            if self.journal is not None:
+                self._record_clear(full)
+            compact_rows(cells, full, lambda: [0]*self.width)
+            self._track_clear(full)
+        return len(full)
+
+
+class BitBoard(Board):
+    """位棋盘：每行存成一个整数位掩码，颜色单独存放在 cells 中。
+
+    碰撞检测是每行一次移位加按位与，满行判断是 row == full_mask，
+    消行只需压缩行数组。结果与 ListBoard 完全一致。
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.full_mask = (1 << width) - 1
+        self.rows = [0] * height
+        self.cells = [[0]*width for _ in range(height)]
+        self._reset_tracking()
+
+    def _filled(self, x, y):
+        return self.rows[y] >> x & 1
+
+    def _row_lists(self):
+        return self.rows, self.cells, self.row_fill, self.row_sums
+
+    def copy(self):
+        # 颜色行与 ListBoard 一样写时复制
+        board = BitBoard.__new__(BitBoard)
+        board.width, board.height = self.width, self.height
+        board.full_mask = self.full_mask
+        board.rows = self.rows.copy()
+        board.cells = self.cells.copy()
+        board._copy_tracking(self)
+        return board
+
+    def _shifted(self, mask, px):
+        # 把方块行掩码平移到第 px 列，越界返回 None
+        if px >= 0:
+            shifted = mask << px
+        else:
+            if mask & ((1 << -px) - 1):
+                return None
+            shifted = mask >> -px
+        if shifted > self.full_mask:
+            return None
+        return shifted
+
+    def collides(self, shape, px, py):
+        rows = self.rows
+        for dy, mask in enumerate(shape_masks(shape)):
+            if not mask:
+                continue
+            shifted = self._shifted(mask, px)
+            y = py + dy
+            if shifted is None or y >= self.height:
+                return True
+            if y >= 0 and rows[y] & shifted:
+                return True
+        return False
+
+    def lock(self, shape, px, py, color):
+        if self.journal is not None:
+            self._record_lock(shape, px, py)
+        rows = self.rows
+        for dy, mask in enumerate(shape_masks(shape)):
+            if not mask:
+                continue
+            y = py + dy
+            rows[y] |= mask << px
+            cells = self.cells[y] = self.cells[y].copy()
+            for x, cell in enumerate(shape[dy]):
+                if cell:
+                    cells[x + px] = color
+
+        full = self._track_lock(shape, px, py)
+        if full:
+            if self.journal is not None:
+                self._record_clear(full)
+            compact_rows(rows, full, 0)
+            compact_rows(self.cells, full, lambda: [0]*self.width)
+            self._track_clear(full)
+        return len(full)
+
+
+BOARDS = {
+    'list': ListBoard,
+    'bit': BitBoard,
+}
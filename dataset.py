@@ -0,0 +1,204 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from board import shape_masks
+from engine import HEIGHT, WIDTH, TetrisEngine
+from tune import save_json
+
+# 训练数据导出（需要 numpy）：python dataset.py dataset --samples 1000000
+# 无界面下若干局，每一步把当前方块的所有候选落点各记一条样本：
+#   boards    放下方块后（消行前）的棋盘，按位打包，第 y*宽+x 位为 (x, y)
+#   features  放下后每列高度 + 空洞、井深、凹凸度、满行数、最高高度
+#   labels    是否为 AI 实际选择的落点
+#   groups    决策序号，同一步的候选共用一个，便于按组做排序学习
+# 样本写进预先分配的 .npy 分片（numpy.memmap），写满一个换下一个，内存占用
+# 与样本总数无关；index.json 记录每个分片的实际条数，写完一个分片就更新。
+# 读取用 load()，各数组是文件的只读内存映射视图，不复制数据。
+
+SHARD_SIZE = 1 << 20  # 每个分片的样本数
+FIELDS = ('boards', 'features', 'labels', 'groups')
+
+
+def feature_names(width):
+    return [f'height{x}' for x in range(width)] + \
+        ['holes', 'wells', 'bumpiness', 'full_lines', 'max_height']
+
+
+class ShardWriter:
+    def __init__(self, directory, width, height, shard_size=SHARD_SIZE):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.width = width
+        self.height = height
+        self.shard_size = shard_size
+        self.board_bytes = (width * height + 7) // 8
+        self.shards = []
+        self.arrays = None
+        self.filled = 0
+        self.count = 0
+
+    def _path(self, name, field):
+        return os.path.join(self.directory, f'{name}.{field}.npy')
+
+    def _open(self):
+        # 分片按满额预先分配，写入时直接落到映射的文件上
+        name = f'shard-{len(self.shards):05d}'
+        n = self.shard_size
+        shapes = {
+            'boards': (np.uint8, (n, self.board_bytes)),
+            'features': (np.float32, (n, self.width + 5)),
+            'labels': (np.uint8, (n,)),
+            'groups': (np.uint32, (n,)),
+        }
+        self.arrays = {field: open_memmap(self._path(name, field), mode='w+', dtype=dtype, shape=shape)
+                       for field, (dtype, shape) in shapes.items()}
+        self.shards.append({'name': name, 'count': 0})
+        self.filled = 0
+
+    def _finish(self):
+        # 刷回磁盘并更新清单，中断时已写完的分片仍然可用
+        for array in self.arrays.values():
+            array.flush()
+        self.shards[-1]['count'] = self.filled
+        self.arrays = None
+        save_json(os.path.join(self.directory, 'index.json'), {
+            'width': self.width,
+            'height': self.height,
+            'features': feature_names(self.width),
+            'samples': self.count,
+            'shards': self.shards,
+        })
+
+    def write(self, values):
+        # values: {字段: 数组}，各数组行数相同；跨分片时拆开写
+        n = len(values['labels'])
+        i = 0
+        while i < n:
+            if self.arrays is None:
+                self._open()
+            k = min(n - i, self.shard_size - self.filled)
+            for field in FIELDS:
+                self.arrays[field][self.filled:self.filled + k] = values[field][i:i + k]
+            self.filled += k
+            self.count += k
+            i += k
+            if self.filled == self.shard_size:
+                self._finish()
+
+    def close(self):
+        if self.arrays is not None:
+            self._finish()
+
+
+def decision_samples(engine, group):
+    """当前方块全部候选落点的样本，返回 (AI 选择的落点, {字段: 数组})；无处可放时返回 None。"""
+    best = engine.ai_search()
+    if best is None:
+        return None
+    board = engine.board
+    width = engine.width
+    nbytes = (width * engine.height + 7) // 8
+    # 整个棋盘拼成一个大整数，每个候选只需或上方块的几行
+    base = 0
+    for y, row in enumerate(board.rows):
+        if row:
+            base |= row << (y * width)
+
+    packed = []
+    features = []
+    labels = []
+    for rotation, state, x, y in engine.candidates(engine.current_piece.kind):
+        bits = base
+        for dy, mask in enumerate(shape_masks(state.shape)):
+            bits |= mask << (x + (y + dy) * width)
+        packed.append(bits.to_bytes(nbytes, 'little'))
+        full_lines, holes, wells, bumpiness, max_height = board.features(state.shape, x, y)
+        features.append(board.placed_heights(state.shape, x, y) +
+                        [holes, wells, bumpiness, full_lines, max_height])
+        labels.append((rotation, x, y) == best)
+
+    return best, {
+        'boards': np.frombuffer(b''.join(packed), dtype=np.uint8).reshape(len(packed), nbytes),
+        'features': np.array(features, dtype=np.float32),
+        'labels': np.array(labels, dtype=np.uint8),
+        'groups': np.full(len(labels), group, dtype=np.uint32),
+    }
+
+
+def generate(directory, samples, seed=0, max_pieces=500, shard_size=SHARD_SIZE, **engine_options):
+    """从 seed 起逐局生成，直到写满 samples 条样本，返回写入的局数。
+    engine_options 传给 TetrisEngine（如 depth=2），决定标签由哪种 AI 给出。"""
+    engine_options['board'] = 'bit'
+    writer = ShardWriter(directory, engine_options.get('width', WIDTH),
+                         engine_options.get('height', HEIGHT), shard_size)
+    group = 0
+    games = 0
+    try:
+        while writer.count < samples:
+            engine = TetrisEngine(seed=seed + games, **engine_options)
+            games += 1
+            while not engine.game_over and engine.pieces < max_pieces and writer.count < samples:
+                result = decision_samples(engine, group)
+                if result is None:
+                    break
+                best, values = result
+                rest = samples - writer.count
+                writer.write({field: array[:rest] for field, array in values.items()})
+                group += 1
+                engine.place(*best)
+    finally:
+        writer.close()
+    return games
+
+
+def load(directory):
+    """以只读内存映射打开全部分片，返回 (清单, [{字段: 数组}])。"""
+    with open(os.path.join(directory, 'index.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+    shards = []
+    for shard in manifest['shards']:
+        count = shard['count']
+        shards.append({field: np.load(os.path.join(directory, f"{shard['name']}.{field}.npy"),
+                                      mmap_mode='r')[:count]
+                       for field in FIELDS})
+    return manifest, shards
+
+
+def unpack_boards(boards, width, height):
+    # 打包的棋盘还原成 (..., 高, 宽) 的 0/1 数组
+    bits = np.unpackbits(boards, axis=-1, count=width * height, bitorder='little')
+    return bits.reshape(*boards.shape[:-1], height, width)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='导出候选落点的棋盘、特征与标签')
+    parser.add_argument('directory', nargs='?', default='dataset')
+    parser.add_argument('--samples', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=0, help='第一局的种子，之后每局加 1')
+    parser.add_argument('--max-pieces', type=int, default=500, help='每局最多放置的方块数')
+    parser.add_argument('--shard-size', type=int, default=SHARD_SIZE, help='每个分片的样本数')
+    parser.add_argument('--depth', type=int, default=1, help='给出标签的 AI 前瞻层数')
+    parser.add_argument('--weights', help='tune.py 调出的权重文件')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        games = generate(args.directory, args.samples, args.seed, args.max_pieces,
+                         args.shard_size, depth=args.depth, weights=args.weights)
+    except KeyboardInterrupt:
+        print('已中断，写完的样本已记入 index.json')
+        return
+    elapsed = time.perf_counter() - start
+    manifest, shards = load(args.directory)
+    positives = sum(int(shard['labels'].sum()) for shard in shards)
+    print(f"{manifest['samples']:,} 条样本（{len(shards)} 个分片，{games} 局，"
+          f"{positives:,} 个选中落点） {manifest['samples'] / elapsed:,.0f} 条/s")
+
+
+if __name__ == '__main__':
+    main()
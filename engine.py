@@ -0,0 +1,380 @@
+import json
+import random
+import time
+from collections import namedtuple
+
+from board import BOARDS
+from cache import EvalCache
+from search import MAX_DEPTH, beam_search
+
+# 游戏参数（与界面无关，不依赖 pygame）
+WIDTH = 10
+HEIGHT = 20
+COLOR_COUNT = 7  # 方块颜色数量（不含背景色 0）
+
+# 局面评估权重：满行数^2.5、空洞、井深、凹凸度、最高高度
+DEFAULT_WEIGHTS = {
+    'lines': 1000,
+    'holes': 300,
+    'wells': 50,
+    'bumpiness': 10,
+    'height': 5,
+}
+
+# 方块形状
+SHAPES = [
+    {"shape": [[1,1,1,1]], "preview_offset": (1, 2)},   # I
+    {"shape": [[1,1],[1,1]], "preview_offset": (1, 1)},  # O
+    {"shape": [[1,1,1],[0,1,0]], "preview_offset": (1, 1)},  # T
+    {"shape": [[1,1,1],[1,0,0]], "preview_offset": (1, 1)},  # L
+    {"shape": [[1,1,1],[0,0,1]], "preview_offset": (1, 1)},  # J
+    {"shape": [[1,1,0],[0,1,1]], "preview_offset": (1, 1)},  # S
+    {"shape": [[0,1,1],[1,1,0]], "preview_offset": (1, 1)}   # Z
+]
+
+# 旋转状态：形状、宽、高、每列最底部方块的行号、方块格偏移 ((y, x), ...)
+Rotation = namedtuple('Rotation', 'shape width height bottom cells')
+
+
+def rotate_shape(shape):
+    return tuple(zip(*reversed(shape)))
+
+
+def build_rotations(shape):
+    # 依次顺时针旋转，去掉重复状态（O 只有 1 种，I/S/Z 只有 2 种）
+    states = []
+    shape = tuple(map(tuple, shape))
+    for _ in range(4):
+        if shape in (s.shape for s in states):
+            break
+        bottom = tuple(max(y for y, row in enumerate(shape) if row[x])
+                       for x in range(len(shape[0])))
+        cells = tuple((y, x) for y, row in enumerate(shape) for x, cell in enumerate(row) if cell)
+        states.append(Rotation(shape, len(shape[0]), len(shape), bottom, cells))
+        shape = rotate_shape(shape)
+    return states
+
+
+# 导入时预先算好每种方块的全部旋转状态
+ROTATIONS = [build_rotations(s["shape"]) for s in SHAPES]
+
+
+# 按 [kind][rotation] 直接取形状，省去 Rotation 的属性查找
+ROTATION_SHAPES = [[state.shape for state in states] for states in ROTATIONS]
+_new_tuple = tuple.__new__
+
+
+class Piece(namedtuple('Piece', 'kind rotation x y color')):
+    """不可变的方块，形状等按 (kind, rotation) 查共享的 ROTATIONS 表。"""
+
+    __slots__ = ()
+
+    @property
+    def state(self):
+        return ROTATIONS[self[0]][self[1]]
+
+    @property
+    def shape(self):
+        return ROTATION_SHAPES[self[0]][self[1]]
+
+    @property
+    def cells(self):
+        return ROTATIONS[self[0]][self[1]].cells
+
+    @property
+    def preview_offset(self):
+        return SHAPES[self[0]]["preview_offset"]
+
+    # 移动、旋转都是一次元组构造，跳过 namedtuple 的 __new__
+    def moved(self, dx=0, dy=0):
+        kind, rotation, x, y, color = self
+        return _new_tuple(Piece, (kind, rotation, x + dx, y + dy, color))
+
+    def rotated(self, rotation):
+        kind, _, x, y, color = self
+        return _new_tuple(Piece, (kind, rotation, x, y, color))
+
+
+def load_weights(path):
+    # 读取调参工具保存的权重文件，缺少的项用默认值补齐
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    weights = dict(DEFAULT_WEIGHTS)
+    weights.update(data.get('weights', data))
+    return weights
+
+
+class TetrisEngine:
+    """纯 Python 的俄罗斯方块模拟核心，可在无显示环境下全速运行。"""
+
+    KINDS = range(len(SHAPES))
+
+    def __init__(self, board='list', evaluator='scalar', depth=1, beam_width=4, time_limit=None,
+                 cache_size=0, weights=None, seed=None, width=WIDTH, height=HEIGHT):
+        # board: 'list' 为逐格列表实现，'bit' 为位棋盘实现
+        # evaluator: 'scalar' 逐个打分，'numpy' 用 numpy 一次性给全部候选打分
+        # depth > 1 时结合预览方块做前瞻搜索（最多 MAX_DEPTH 层），每层保留 beam_width 个棋盘，
+        # time_limit 为每步搜索的时限（秒）
+        # cache_size > 0 时按棋盘哈希缓存评估结果，最多保留 cache_size 个局面
+        # weights: 评估权重字典或权重文件路径，默认 DEFAULT_WEIGHTS
+        # seed: 本局方块序列的随机种子，不指定时随机选一个（见 reset）
+        # width, height: 棋盘尺寸，默认 10x20
+        if not 1 <= depth <= MAX_DEPTH:
+            raise ValueError(f'depth 须在 1 到 {MAX_DEPTH} 之间，收到 {depth}')
+        self.board_type = board
+        self.width = width
+        self.height = height
+        self.evaluator = evaluator
+        self.depth = depth
+        self.beam_width = beam_width
+        self.time_limit = time_limit
+        self.cache = EvalCache(cache_size) if cache_size else None
+        if isinstance(weights, str):
+            weights = load_weights(weights)
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        if evaluator == 'numpy':
+            import vector_eval
+            self.vector_eval = vector_eval
+        self.move_sequence = []
+        # 可选的观察者（见 spectate.Spectators）：开局和对局中途结束时调用
+        # listener.snapshot(engine)，每块方块锁定并换上新方块后调用
+        # listener.locked(engine, 锁定的方块, 消掉的行号)
+        self.listener = None
+        self.reset(seed)
+
+    @property
+    def game_board(self):
+        return self.board.cells
+
+    def reset(self, seed=None):
+        # 每局用独立的随机数发生器，记下种子与每块的落点 history 即可完整重放
+        self.seed = random.getrandbits(32) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.history = []
+        self.cleared_rows = []  # 最近一块方块消掉的行号，只在有 listener 时记录
+        self.board = BOARDS[self.board_type](self.width, self.height)
+        self.score = 0
+        self.pieces = 0  # 已锁定的方块数
+        self.current_piece = self.new_piece()
+        self.next_piece = self.new_piece()
+        self.game_over = False
+        self.move_sequence = []
+        if self.listener is not None:
+            self.listener.snapshot(self)
+
+    def new_piece(self):
+        kind = self.rng.randrange(len(SHAPES))
+        color = self.rng.randint(1, COLOR_COUNT)
+        return Piece(kind, 0, self.width//2 - len(SHAPES[kind]["shape"][0])//2, 0, color)
+
+    def check_collision(self, piece, dx=0, dy=0):
+        return self.board.collides(piece.shape, piece.x + dx, piece.y + dy)
+
+    def rotate_piece(self):
+        piece = self.current_piece
+        rotated = piece.rotated((piece.rotation + 1) % len(ROTATIONS[piece.kind]))
+        if not self.check_collision(rotated):
+            self.current_piece = rotated
+
+    def lock_piece(self):
+        piece = self.current_piece
+        self.history.append((piece.rotation, piece.x, piece.y))
+        if self.listener is not None:
+            self.cleared_rows = self.board.full_rows(piece.shape, piece.x, piece.y)
+        lines_cleared = self.board.lock(piece.shape, piece.x, piece.y, piece.color)
+
+        if lines_cleared > 0:
+            self.score += 100 * (2 ** lines_cleared)
+        return lines_cleared
+
+    def spawn_piece(self):
+        # 锁定后换上预览方块，出生即碰撞则游戏结束
+        locked = self.current_piece
+        self.pieces += 1
+        self.current_piece = self.next_piece
+        self.next_piece = self.new_piece()
+        if self.check_collision(self.current_piece):
+            self.game_over = True
+        if self.listener is not None:
+            self.listener.locked(self, locked, self.cleared_rows)
+
+    def end_game(self):
+        # 无处可放时结束本局，观察者会收到一次带结束标记的快照
+        self.game_over = True
+        if self.listener is not None:
+            self.listener.snapshot(self)
+
+    def hard_drop(self):
+        # 按列高直接算出落点，与棋盘高度无关（见 drop_row）
+        piece = self.current_piece
+        y = self.drop_row(piece.state, piece.x, piece.y, self.board.heights())
+        self.current_piece = piece.moved(dy=y - piece.y)
+        lines = self.lock_piece()
+        self.spawn_piece()
+        return lines
+
+    def step(self, action):
+        """执行一个操作：'rotate'、'left'、'right'、'down'（下落一格）或 'drop'。
+        返回本步是否锁定了方块。"""
+        if self.game_over:
+            return False
+        if action == 'rotate':
+            self.rotate_piece()
+        elif action == 'left' and not self.check_collision(self.current_piece, dx=-1):
+            self.current_piece = self.current_piece.moved(dx=-1)
+        elif action == 'right' and not self.check_collision(self.current_piece, dx=1):
+            self.current_piece = self.current_piece.moved(dx=1)
+        elif action == 'down':
+            if not self.check_collision(self.current_piece, dy=1):
+                self.current_piece = self.current_piece.moved(dy=1)
+            else:
+                self.lock_piece()
+                self.spawn_piece()
+                return True
+        elif action == 'drop':
+            self.hard_drop()
+            return True
+        return False
+
+    def place(self, rotation, x, y=None):
+        """把当前方块转到第 rotation 个旋转状态（按状态数取模）、移到第 x 列后直接落下并锁定，
+        返回消除行数。给出 y 时不下落，直接锁定在第 y 行（重放，或搜索已算出落点时）。"""
+        if self.game_over:
+            return 0
+        piece = self.current_piece
+        # 旋转序号按该方块的状态数取模，与 VecEnv.step 一致
+        rotation %= len(ROTATIONS[piece.kind])
+        piece = Piece(piece.kind, rotation, x, piece.y if y is None else y, piece.color)
+        self.current_piece = piece
+        if self.check_collision(piece):
+            self.end_game()
+            return 0
+        if y is None:
+            return self.hard_drop()
+        lines = self.lock_piece()
+        self.spawn_piece()
+        return lines
+
+    def evaluate_position(self, piece):
+        return self.evaluate_placement(piece.shape, piece.x, piece.y)
+
+    def evaluate_placement(self, shape, x, y, board=None):
+        board = board or self.board
+        if self.cache is None:
+            return self.score_features(board.features(shape, x, y))
+        key = board.placement_hash(shape, x, y)
+        score = self.cache.get(key)
+        if score is None:
+            score = self.score_features(board.features(shape, x, y))
+            self.cache.put(key, score)
+        return score
+
+    def score_features(self, features):
+        full_lines, holes, wells, bumpiness, max_height = features
+        w = self.weights
+        return (
+            full_lines ** 2.5 * w['lines']
+            - holes * w['holes']
+            - wells * w['wells']
+            - bumpiness * w['bumpiness']
+            - max_height * w['height']
+        )
+
+    def landing_row(self, state, x, heights):
+        # 按列高直接算出落点：每列方块底部都要落在该列最高方块之上
+        height = self.height
+        return min(height - heights[x + c] - 1 - state.bottom[c] for c in range(state.width))
+
+    def drop_row(self, state, x, y, heights, board=None):
+        # 从第 y 行直接落下的落点。列高算出的落点在 y 之上时，方块要钻到
+        # 悬空方块下面（比如 S/Z 外框里的空格），列高不适用，逐行试探；
+        # 第 y 行本身就碰撞时返回 None
+        landing = self.landing_row(state, x, heights)
+        if landing >= y:
+            return landing
+        board = board or self.board
+        if board.collides(state.shape, x, y):
+            return None
+        while not board.collides(state.shape, x, y + 1):
+            y += 1
+        return y
+
+    def candidates(self, kind, board=None):
+        # 按 (旋转状态, x) 顺序列出所有合法落点 (rotation, state, x, y)，
+        # 每个落点都是从出生行（第 0 行）直接落下得到的，与 hard_drop 一致
+        board = board or self.board
+        heights = board.heights()
+        for rotation, state in enumerate(ROTATIONS[kind]):
+            for x in range(self.width - state.width + 1):
+                y = self.drop_row(state, x, 0, heights, board)
+                if y is not None:
+                    yield rotation, state, x, y
+
+    def ai_search(self):
+        """返回当前方块的最佳落点 (旋转状态, x, y)，无处可放时返回 None。"""
+        if self.depth > 1:
+            return beam_search(self, self.depth, self.beam_width, self.time_limit)
+        if self.evaluator == 'numpy':
+            return self.ai_search_batched()
+        best_score = -float('inf')
+        best = None
+        for rotation, state, x, y in self.candidates(self.current_piece.kind):
+            score = self.evaluate_placement(state.shape, x, y)
+            if score > best_score:
+                best_score = score
+                best = (rotation, x, y)
+        return best
+
+    def ai_search_batched(self):
+        found = list(self.candidates(self.current_piece.kind))
+        if not found:
+            return None
+        placements = [(state.shape, x, y) for _, state, x, y in found]
+        rotation, _, x, y = found[self.vector_eval.best_index(self.game_board, placements, self.weights)]
+        return rotation, x, y
+
+    def ai_think(self):
+        best = self.ai_search()
+        if best is None:
+            return []
+        rotation, x, y = best
+        piece = self.current_piece
+        presses = (rotation - piece.rotation) % len(ROTATIONS[piece.kind])
+        return self.generate_moves(piece, Piece(piece.kind, rotation, x, y, piece.color), presses)
+
+    def generate_moves(self, original, target, rotations):
+        moves = []
+        if rotations in (1, 3):
+            moves += ['rotate'] * rotations
+        elif rotations == 2:
+            moves += ['rotate', 'rotate']
+
+        dx = target.x - original.x
+        if dx != 0:
+            direction = 'right' if dx > 0 else 'left'
+            moves += [direction] * abs(dx)
+
+        moves.append('drop')
+        return moves
+
+    def play(self, max_pieces=None):
+        """无界面全速进行一局 AI 游戏，返回放置的方块数。"""
+        pieces = 0
+        while not self.game_over and (max_pieces is None or pieces < max_pieces):
+            best = self.ai_search()
+            if best is None:
+                self.end_game()
+                break
+            # 搜索已经按列高算出了落点行，直接锁定，不再下落
+            self.place(*best)
+            pieces += 1
+        return pieces
+
+
+if __name__ == '__main__':
+    engine = TetrisEngine()
+    start = time.perf_counter()
+    pieces = engine.play(max_pieces=500)
+    elapsed = time.perf_counter() - start
+    print(f'score={engine.score} pieces={pieces} '
+          f'time={elapsed:.2f}s ({pieces/elapsed:.1f} pieces/s)')
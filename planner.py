@@ -0,0 +1,170 @@
+import multiprocessing
+import os
+import queue
+import time
+
+from engine import ROTATIONS, Piece, TetrisEngine
+from search import MAX_DEPTH, beam_search
+
+# 后台规划进程：搜索不在帧循环里进行，帧循环每帧只取一次结果。
+# 用进程而不是线程，纯 Python 的搜索不会和帧循环争抢 GIL。
+#
+# 每块方块有两类任务：
+#   - 预判：主循环一确定当前方块的落点，就在“当前方块落下后”的棋盘上
+#     为 next_piece 规划（此时还不知道它的预览方块，只做单步搜索）；
+#   - 精算：方块真正出现后，用它的预览方块做完整的前瞻搜索。
+# 截止时间到了还没算完，就依次退回精算的阶段性最优、预判结果，
+# 都没有时才在主线程做一次单步搜索。
+
+
+def _worker(requests, results, oldest, beam_width, engine_options):
+    # 降低优先级，单核机器上也优先保证帧循环
+    if hasattr(os, 'nice'):
+        os.nice(10)
+    # 规划进程专用的引擎，只借用它的搜索与评估，不与主循环共享状态
+    engine = TetrisEngine(**engine_options)
+    while True:
+        job = requests.get()
+        if job is None:
+            return
+        key, board, current, next_piece, depth, time_limit = job
+        # 已经过时的方块不再规划
+        if key[:2] < tuple(oldest):
+            continue
+        engine.board = board
+        engine.current_piece = current
+        engine.next_piece = next_piece or current
+        # 结果附带搜索到此刻的耗时，主循环据此记录 ai_think
+        start = time.perf_counter()
+        best = beam_search(engine, depth, beam_width, time_limit,
+                           progress=lambda move: results.put(
+                               (key, move, False, time.perf_counter() - start)))
+        results.put((key, best, True, time.perf_counter() - start))
+
+
+class Planner:
+    def __init__(self, budget, depth=2, beam_width=4, **engine_options):
+        # budget: 方块出现后最多等待精算的时间（秒）
+        if not 1 <= depth <= MAX_DEPTH:
+            raise ValueError(f'depth 须在 1 到 {MAX_DEPTH} 之间，收到 {depth}')
+        self.budget = budget
+        self.depth = depth
+        context = multiprocessing.get_context('spawn')
+        self.requests = context.Queue()
+        self.results = context.Queue()
+        # 任务键为 (局号, 方块序号, 类型)，早于 oldest 的结果一律丢弃；
+        # oldest 放在共享内存里，规划进程据此跳过过时的任务
+        self.shared_oldest = context.Array('q', 2, lock=False)
+        self.epoch = 0
+        self.piece = None
+        self.deadline = None
+        self.plans = {}
+        self.expected = {}
+        # 最近一次 moves_for 返回的走法实际花在搜索上的时间（秒）
+        self.think_time = None
+        self.process = context.Process(
+            target=_worker, daemon=True,
+            args=(self.requests, self.results, self.shared_oldest, beam_width, engine_options))
+        self.process.start()
+
+    @property
+    def oldest(self):
+        return tuple(self.shared_oldest)
+
+    @oldest.setter
+    def oldest(self, value):
+        self.shared_oldest[:] = value
+
+    def close(self):
+        self.requests.put(None)
+        self.process.join(timeout=1)
+
+    def reset(self):
+        # 重新开局后旧的任务与结果都作废
+        self.epoch += 1
+        self.oldest = (self.epoch, 0)
+        self.piece = None
+        self.plans = {}
+        self.expected = {}
+
+    def _submit(self, key, board, current, next_piece, depth, time_limit=None):
+        self.requests.put((key, board, current, next_piece, depth, time_limit))
+
+    def _store(self, key, move, done, seconds):
+        if key[:2] >= self.oldest:
+            self.plans[key[1:]] = (move, done, seconds)
+
+    def _drain(self):
+        while True:
+            try:
+                self._store(*self.results.get_nowait())
+            except queue.Empty:
+                return
+
+    def _wait(self, key, until):
+        # 阻塞等待规划进程的结果（不占用 CPU），直到 key 的精算完成或到达 until
+        while not self.plans.get(key, (None, False))[1]:
+            remaining = until - time.perf_counter()
+            if remaining <= 0:
+                return
+            try:
+                self._store(*self.results.get(timeout=remaining))
+            except queue.Empty:
+                return
+
+    def moves_for(self, game, wait_until=None):
+        """返回当前方块的操作序列；精算还没结束且未到截止时间时返回 None，
+        无处可放时返回 []。给出 wait_until 时最多等到这一时刻再返回 None。"""
+        self._drain()
+        index = game.pieces
+        if self.piece != index:
+            # 新方块出现：丢弃旧结果，提交精算任务
+            self.piece = index
+            self.oldest = (self.epoch, index)
+            self.plans = {k: v for k, v in self.plans.items() if k[0] >= index}
+            self.deadline = time.perf_counter() + self.budget
+            self._submit((self.epoch, index, 'refine'), game.board.copy(), game.current_piece,
+                         game.next_piece, self.depth, self.budget)
+
+        if wait_until is not None:
+            self._wait((index, 'refine'), min(wait_until, self.deadline))
+        refined = self.plans.get((index, 'refine'))
+        if refined and refined[1]:
+            move, _, self.think_time = refined
+        elif time.perf_counter() < self.deadline:
+            return None
+        elif refined and refined[0] is not None:
+            move, _, self.think_time = refined
+        else:
+            move, self.think_time = self._speculated(game, index)
+            if move is None:
+                start = time.perf_counter()
+                move = game.ai_search()
+                self.think_time = time.perf_counter() - start
+                if move is None:
+                    # 记作这块方块的最终结果，再次询问时不必重新搜索
+                    self.plans[(index, 'refine')] = (None, True, self.think_time)
+        if move is None:
+            return []
+
+        self._speculate(game, index, move)
+        rotation, x, y = move
+        piece = game.current_piece
+        presses = (rotation - piece.rotation) % len(ROTATIONS[piece.kind])
+        return game.generate_moves(piece, Piece(piece.kind, rotation, x, y, piece.color), presses)
+
+    def _speculated(self, game, index):
+        # 预判时假设的棋盘与实际一致才可采用
+        plan = self.plans.get((index, 'speculate'))
+        if plan and plan[1] and self.expected.get(index) == game.board.zobrist:
+            return plan[0], plan[2]
+        return None, None
+
+    def _speculate(self, game, index, move):
+        # 假设当前方块按 move 落下，提前为下一块规划
+        rotation, x, y = move
+        piece = game.current_piece
+        board = game.board.copy()
+        board.lock(ROTATIONS[piece.kind][rotation].shape, x, y, piece.color)
+        self.expected = {index + 1: board.zobrist}
+        self._submit((self.epoch, index + 1, 'speculate'), board, game.next_piece, None, 1)
@@ -0,0 +1,137 @@
+import json
+import os
+import time
+from collections import deque
+
+# 帧循环分阶段计时。设置环境变量 TETRIS_PROFILE=1（或 Test.py --profile）开启：
+#   TETRIS_OVERLAY=1 / --overlay      在分数下方显示各阶段耗时
+#   TETRIS_TRACE=trace.json / --trace 退出时写出 Chrome trace（chrome://tracing 或 Perfetto 打开）
+# 未开启时用 NullProfiler，每帧只多几次空方法调用。
+
+# 直方图分桶（毫秒），最后一桶为 66ms 以上
+BUCKETS = (1, 2, 4, 8, 16, 33, 66)
+
+
+class Profiler:
+    enabled = True
+
+    def __init__(self, window=600, overlay=False, trace_path=None, trace_limit=500000):
+        # window: 每项保留最近多少个样本（默认约 10 秒）
+        self.window = window
+        self.overlay = overlay
+        self.trace_path = trace_path
+        self.trace = deque(maxlen=trace_limit) if trace_path else None
+        self.samples = {}
+        self.origin = time.perf_counter()
+        self.frame_start = self.last = self.origin
+        self.frames = 0
+        self.lines = []
+
+    def begin_frame(self):
+        self.frame_start = self.last = time.perf_counter()
+
+    def mark(self, name):
+        # 记录从上一个 mark（或帧开始）到现在的耗时，计入阶段 name
+        now = time.perf_counter()
+        self.record(name, self.last, now)
+        self.last = now
+
+    def end_frame(self):
+        now = time.perf_counter()
+        self.record('frame', self.frame_start, now)
+        self.frames += 1
+
+    def record(self, name, start, end):
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = deque(maxlen=self.window)
+        samples.append(end - start)
+        if self.trace is not None:
+            self.trace.append((name, start, end))
+
+    def stats(self, name):
+        # 最近 window 个样本的统计（毫秒）
+        values = sorted(self.samples.get(name, ()))
+        if not values:
+            return None
+        pick = lambda p: values[min(len(values) - 1, int(len(values) * p))] * 1000
+        return {
+            'count': len(values),
+            'mean': sum(values) / len(values) * 1000,
+            'p50': pick(0.5),
+            'p99': pick(0.99),
+            'max': values[-1] * 1000,
+        }
+
+    def histogram(self, name):
+        counts = [0] * (len(BUCKETS) + 1)
+        for value in self.samples.get(name, ()):
+            ms = value * 1000
+            counts[next((i for i, edge in enumerate(BUCKETS) if ms < edge), len(BUCKETS))] += 1
+        return counts
+
+    def overlay_lines(self, every=30):
+        # 叠加显示的文字每 every 帧刷新一次，避免每帧重新渲染字体
+        if self.frames % every == 0 or not self.lines:
+            self.lines = []
+            for name in self.samples:
+                s = self.stats(name)
+                self.lines.append(f"{name:<8}{s['p50']:5.1f}{s['p99']:6.1f}ms")
+        return self.lines
+
+    def summary(self):
+        labels = [f'<{edge}' for edge in BUCKETS] + [f'>={BUCKETS[-1]}']
+        lines = [f'最近 {self.window} 个样本（毫秒）；直方图分桶: ' + ' '.join(labels)]
+        for name in self.samples:
+            s = self.stats(name)
+            lines.append(f"{name:<10} n={s['count']:<5} mean={s['mean']:6.2f} p50={s['p50']:6.2f} "
+                         f"p99={s['p99']:6.2f} max={s['max']:7.2f}  "
+                         + ' '.join(str(c) for c in self.histogram(name)))
+        return '\n'.join(lines)
+
+    def write_trace(self, path):
+        events = [{
+            'name': name, 'ph': 'X', 'pid': os.getpid(), 'tid': 0,
+            'ts': (start - self.origin) * 1e6, 'dur': (end - start) * 1e6,
+        } for name, start, end in self.trace]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+    def close(self):
+        print(self.summary())
+        if self.trace_path:
+            self.write_trace(self.trace_path)
+            print(f'trace 已写入 {self.trace_path}')
+
+
+class NullProfiler:
+    enabled = False
+    overlay = False
+
+    def begin_frame(self):
+        pass
+
+    def mark(self, name):
+        pass
+
+    def end_frame(self):
+        pass
+
+    def record(self, name, start, end):
+        pass
+
+    def close(self):
+        pass
+
+
+def env_flag(name):
+    return os.environ.get(name, '') not in ('', '0')
+
+
+def make_profiler(profile=False, overlay=False, trace_path=None):
+    # 命令行参数与环境变量任一开启即可
+    overlay = overlay or env_flag('TETRIS_OVERLAY')
+    trace_path = trace_path or os.environ.get('TETRIS_TRACE')
+    if profile or overlay or trace_path or env_flag('TETRIS_PROFILE'):
+        return Profiler(overlay=overlay, trace_path=trace_path)
+    return NullProfiler()
@@ -0,0 +1,134 @@
+import pygame
+
+# 增量渲染：方块贴图、文字只生成一次，每帧只重画变化的格子，
+# 并且只把这些脏矩形提交给 pygame.display.update()
+
+
+class Renderer:
+    def __init__(self, screen, block_size, border, colors, width, height):
+        self.screen = screen
+        self.block_size = block_size
+        self.border = border
+        self.colors = colors
+        self.width = width
+        self.height = height
+        # 每种颜色预先画好普通和预览两种方块贴图
+        self.sprites = {
+            (color, preview): self.make_sprite(color, preview)
+            for color in range(1, len(colors))
+            for preview in (False, True)
+        }
+        self.background = pygame.Surface(screen.get_size())
+        self.background.fill(colors[0])
+        self.text_cache = {}
+        self.invalidate()
+
+    def make_sprite(self, color, is_preview=False):
+        # 与原来的 draw_block 画法相同，只是画在一张透明贴图上
+        size = self.block_size
+        border = self.border * 2 if is_preview else self.border
+        sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+        pygame.draw.rect(sprite, self.colors[color],
+                         (border, border, size - 2*border, size - 2*border))
+        pygame.draw.line(sprite, (255,255,255), (0, 0), (size, 0), 2)
+        pygame.draw.line(sprite, (255,255,255), (0, 0), (0, size), 2)
+        return sprite
+
+    def draw_background(self, preview_box):
+        # 静态部分只画一次：底色、游戏区域边框、预览框
+        surface = pygame.Surface(self.screen.get_size())
+        surface.fill(self.colors[0])
+        pygame.draw.rect(surface, (100,100,100),
+                         (0, 0, self.block_size*self.width, self.block_size*self.height), 3)
+        pygame.draw.rect(surface, (80,80,80), preview_box, 0)
+        return surface
+
+    def set_background(self, surface):
+        # 静态背景（底色、边框、预览框等），设置后整屏重画一次
+        self.background = surface
+        self.invalidate()
+
+    def invalidate(self):
+        self.screen.blit(self.background, (0, 0))
+        self.shown = [[0]*self.width for _ in range(self.height)]
+        self.blitted = {}
+        self.dirty = [self.screen.get_rect()]
+
+    def erase(self, rect):
+        self.screen.blit(self.background, rect, rect)
+        self.dirty.append(rect)
+
+    def draw_board(self, cells, piece=None):
+        # 目标画面 = 棋盘 + 当前方块，只重画与上一帧不同的格子
+        target = [row.copy() for row in cells]
+        if piece is not None:
+            for y, x in piece.cells:
+                ty, tx = y + piece.y, x + piece.x
+                if 0 <= ty < self.height and 0 <= tx < self.width:
+                    target[ty][tx] = piece.color
+
+        size = self.block_size
+        for y, row in enumerate(target):
+            shown = self.shown[y]
+            if row == shown:
+                continue
+            first = last = None
+            for x, color in enumerate(row):
+                if color == shown[x]:
+                    continue
+                rect = pygame.Rect(x*size, y*size, size, size)
+                self.screen.blit(self.background, rect, rect)
+                if color:
+                    self.screen.blit(self.sprites[(color, False)], rect)
+                if first is None:
+                    first = x
+                last = x
+            # 同一行的变化合并成一个脏矩形
+            self.dirty.append(pygame.Rect(first*size, y*size, (last - first + 1)*size, size))
+            self.shown[y] = row
+
+    def draw_preview(self, piece, grid_x, grid_y, box):
+        # 预览方块变化时才重画预览框
+        key = (piece.shape, piece.color)
+        if self.blitted.get('preview') == key:
+            return
+        area = pygame.Rect(box)
+        size = self.block_size
+        ox, oy = piece.preview_offset
+        blocks = []
+        for y, x in piece.cells:
+            rect = pygame.Rect((grid_x + x + ox)*size, (grid_y + y + oy)*size, size, size)
+            blocks.append(rect)
+            area.union_ip(rect)
+        area.union_ip(self.blitted.get('preview_area', area))
+        self.erase(area)
+        for rect in blocks:
+            self.screen.blit(self.sprites[(piece.color, True)], rect)
+        self.blitted['preview'] = key
+        self.blitted['preview_area'] = area
+
+    def blit(self, key, surface, pos):
+        # 同一位置的同一张贴图不重复绘制；换图时先擦掉旧的区域
+        if self.blitted.get(key) == (surface, pos):
+            return
+        old = self.blitted.get(key + '_rect')
+        if old is not None:
+            self.erase(old)
+        rect = surface.get_rect(topleft=pos)
+        self.screen.blit(surface, rect)
+        self.dirty.append(rect)
+        self.blitted[key] = (surface, pos)
+        self.blitted[key + '_rect'] = rect
+
+    def text(self, key, text, font, pos, color=(255,255,255)):
+        # 文字内容不变时沿用上次渲染好的贴图
+        cached = self.text_cache.get(key)
+        if cached is None or cached[0] != text:
+            cached = (text, font.render(text, True, color))
+            self.text_cache[key] = cached
+        self.blit(key, cached[1], pos)
+
+    def update(self):
+        if self.dirty:
+            pygame.display.update(self.dirty)
+            self.dirty = []
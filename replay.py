@@ -0,0 +1,132 @@
+import argparse
+import struct
+import time
+
+from engine import HEIGHT, WIDTH, TetrisEngine
+
+# 重放文件：文件头 + 每块方块一个记录 (旋转状态, x, y)，标准 10x20 棋盘每条 2 字节，
+# 大棋盘装不下时每条 4 字节。方块序列由种子决定，因此几百块的一局只有一两 KB，
+# 并能逐块精确重放。
+#   python replay.py game.trp              以每秒 5 块的速度回放
+#   python replay.py game.trp --speed 50   任意速度回放
+#   python replay.py game.trp --headless   无界面全速重算并核对得分
+
+MAGIC = b'TRP2'
+# 魔数、宽、高、种子、最终得分、方块数
+HEADER = struct.Struct('<4sHHQII')
+
+
+def record_format(width, height):
+    # 旋转状态占 2 位，x、y 按棋盘尺寸所需的位数依次排在后面
+    x_bits = (width - 1).bit_length()
+    y_bits = (height - 1).bit_length()
+    code = 'H' if 2 + x_bits + y_bits <= 16 else 'I'
+    return code, x_bits, y_bits
+
+
+def dumps(engine):
+    count = len(engine.history)
+    code, x_bits, y_bits = record_format(engine.width, engine.height)
+    header = HEADER.pack(MAGIC, engine.width, engine.height, engine.seed, engine.score, count)
+    records = struct.pack(f'<{count}{code}', *(
+        (rotation << x_bits | x) << y_bits | y for rotation, x, y in engine.history))
+    return header + records
+
+
+def loads(data):
+    magic, width, height, seed, score, count = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError('不是重放文件')
+    code, x_bits, y_bits = record_format(width, height)
+    records = struct.unpack_from(f'<{count}{code}', data, HEADER.size)
+    x_mask, y_mask = (1 << x_bits) - 1, (1 << y_bits) - 1
+    moves = [(r >> (x_bits + y_bits), r >> y_bits & x_mask, r & y_mask) for r in records]
+    return {'width': width, 'height': height, 'seed': seed, 'score': score, 'moves': moves}
+
+
+def save(path, engine):
+    with open(path, 'wb') as f:
+        f.write(dumps(engine))
+
+
+def load(path):
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def replay(record, board='bit'):
+    """按记录无界面重算一局，返回结束时的引擎。"""
+    engine = TetrisEngine(board=board, seed=record['seed'],
+                          width=record['width'], height=record['height'])
+    for move in record['moves']:
+        engine.place(*move)
+    return engine
+
+
+def play_back(record, speed):
+    # 用游戏窗口回放，speed 为每秒放置的方块数（窗口只支持标准尺寸）
+    if (record['width'], record['height']) != (WIDTH, HEIGHT):
+        raise ValueError(f"回放窗口只支持 {WIDTH}x{HEIGHT}，"
+                         f"{record['width']}x{record['height']} 的对局请用 --headless")
+    import pygame
+    from render import Renderer
+    from Test import BLOCK_SIZE, BORDER, COLORS, FPS, PREVIEW_BOX, PREVIEW_X, PREVIEW_Y
+
+    pygame.init()
+    screen = pygame.display.set_mode((BLOCK_SIZE*(WIDTH+7), BLOCK_SIZE*HEIGHT))
+    pygame.display.set_caption("AI Tetris Replay")
+    clock = pygame.time.Clock()
+    font = pygame.font.SysFont('consolas', 24)
+    renderer = Renderer(screen, BLOCK_SIZE, BORDER, COLORS, WIDTH, HEIGHT)
+    renderer.set_background(renderer.draw_background(PREVIEW_BOX))
+
+    engine = TetrisEngine(board='bit', seed=record['seed'])
+    moves = record['moves']
+    placed = 0
+    due = 0.0
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                return engine
+
+        due += clock.tick(FPS) / 1000 * speed
+        while due >= 1 and placed < len(moves):
+            engine.place(*moves[placed])
+            placed += 1
+            due -= 1
+
+        finished = placed == len(moves)
+        renderer.draw_preview(engine.next_piece, PREVIEW_X, PREVIEW_Y, PREVIEW_BOX)
+        renderer.draw_board(engine.game_board, None if finished else engine.current_piece)
+        renderer.text('score', f'Score: {engine.score}', font, (BLOCK_SIZE*(WIDTH+1), 20))
+        renderer.text('pieces', f'{placed}/{len(moves)}', font, (BLOCK_SIZE*(WIDTH+1), 50))
+        if finished:
+            renderer.text('over', 'Replay finished', font, (BLOCK_SIZE, BLOCK_SIZE*HEIGHT//2))
+        renderer.update()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='重放 Test.py --record 保存的对局')
+    parser.add_argument('path')
+    parser.add_argument('--speed', type=float, default=5, help='每秒放置的方块数')
+    parser.add_argument('--headless', action='store_true', help='不开窗口，全速重算')
+    args = parser.parse_args()
+
+    record = load(args.path)
+    if args.headless:
+        start = time.perf_counter()
+        engine = replay(record)
+        elapsed = time.perf_counter() - start
+        print(f"seed={record['seed']} pieces={len(record['moves'])} score={engine.score} "
+              f"{len(record['moves']) / elapsed:,.0f} pieces/s")
+    else:
+        engine = play_back(record, args.speed)
+        if engine.pieces < len(record['moves']):
+            return
+    if engine.score != record['score']:
+        print(f"!! 重放得分 {engine.score} 与记录的 {record['score']} 不一致")
+
+
+if __name__ == '__main__':
+    main()
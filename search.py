@@ -0,0 +1,94 @@
+import time
+
+# 多步前瞻搜索：用当前方块和预览方块组成落点序列，
+# 每一层只保留得分最高的 beam_width 个棋盘，超出时限时返回已找到的最佳走法
+
+# 可搜索的层数：当前方块、预览方块，再加一层对未知方块取平均
+MAX_DEPTH = 3
+
+
+def line_bonus(engine, full_lines):
+    # 与 score_features 中的消行奖励一致，用于累计前几层的消行得分
+    return full_lines ** 2.5 * engine.weights['lines']
+
+
+def descend(board, path):
+    # 在同一块棋盘上依次试放 path 中的方块，搜索完用 board.pop() 撤销，
+    # 每个节点只记落点序列，不复制棋盘
+    board.push()
+    for shape, x, y in path:
+        board.lock(shape, x, y, 1)
+
+
+def expand(engine, nodes, kind, deadline):
+    # 把每个节点按 kind 的所有落点展开，返回 [(得分, 累计消行奖励, 落点序列, 首步)]
+    board = engine.board
+    children = []
+    for _, bonus, path, first in nodes:
+        descend(board, path)
+        try:
+            for rotation, state, x, y in engine.candidates(kind, board):
+                value = bonus + engine.evaluate_placement(state.shape, x, y, board)
+                children.append((value, bonus + line_bonus(engine, board.full_lines(state.shape, x, y)),
+                                 path + ((state.shape, x, y),), first or (rotation, x, y)))
+        finally:
+            board.pop()
+        if deadline is not None and time.perf_counter() > deadline:
+            break
+    return children
+
+
+def expected_value(engine, node):
+    # 预览之外的方块未知：对每种方块取最佳落点，再对所有种类取平均
+    _, bonus, path, _ = node
+    board = engine.board
+    descend(board, path)
+    try:
+        total = 0
+        for kind in engine.KINDS:
+            best = -float('inf')
+            for _, state, x, y in engine.candidates(kind, board):
+                best = max(best, engine.evaluate_placement(state.shape, x, y, board))
+            if best == -float('inf'):
+                # 这种方块已无处可放，视为必输
+                return best
+            total += bonus + best
+        return total / len(engine.KINDS)
+    finally:
+        board.pop()
+
+
+def beam_search(engine, depth=2, beam_width=4, time_limit=None, progress=None):
+    """在 current_piece、next_piece（以及 depth 超出时的一层未知方块）上做定宽搜索，
+    返回首个方块的最佳落点 (旋转状态, x, y)，无处可放时返回 None。
+    progress(best) 在每层搜索完成、最优首步更新时调用。
+    搜索在 engine.board 上试放后撤销，返回时棋盘保持原样。"""
+    deadline = time.perf_counter() + time_limit if time_limit else None
+    known = [engine.current_piece.kind, engine.next_piece.kind]
+
+    nodes = [(0, 0, (), None)]
+    best = None
+    for level in range(min(depth, len(known))):
+        children = expand(engine, nodes, known[level], deadline)
+        if not children:
+            break
+        children.sort(key=lambda child: child[0], reverse=True)
+        # 每层完成后记下当前最优首步，超时也至少有一步可走
+        best = children[0][3]
+        if progress is not None:
+            progress(best)
+        if deadline is not None and time.perf_counter() > deadline:
+            return best
+        nodes = children[:beam_width]
+
+    if depth > len(known) and best is not None:
+        best_value = -float('inf')
+        for node in nodes:
+            value = expected_value(engine, node)
+            if value > best_value:
+                best_value, best = value, node[3]
+                if progress is not None:
+                    progress(best)
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+    return best
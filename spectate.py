@@ -0,0 +1,330 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import queue
+import stat
+import struct
+import sys
+import time
+
+from board import MASK64, zobrist_keys
+from engine import TetrisEngine
+
+# 观战：把对局通过 TCP 或 Unix 套接字广播给局域网内的其他屏幕。
+# 开局（以及每隔若干块）发一次完整快照，之后每块方块锁定只发一条增量：
+# 锁定的格子、消掉的行、新的当前/预览方块和得分，10x20 棋盘约 50 字节。
+# 每条消息都带着棋盘的 Zobrist 哈希，客户端据此核对自己重建的棋盘。
+#   python Test.py --spectate 0.0.0.0:7777          游戏窗口同时开放观战
+#   python spectate.py 127.0.0.1:7777 --serve       无界面 AI 对局作为观战源
+#   python spectate.py 127.0.0.1:7777 --clients 50  无界面观众，重建并核对棋盘
+# 地址为 主机:端口 时用 TCP，否则视为 Unix 套接字路径。
+
+# 快照：b'S' + 宽、高、得分、方块数、是否结束、哈希 + 当前/预览方块 + 宽*高 字节颜色
+SNAPSHOT = struct.Struct('<HHIIBQ')
+# 增量：b'D' + 得分、方块数、是否结束、哈希、颜色、格子数、消行数
+#       + 每格 (x, y) + 每个消掉的行号（锁定后、消行前的行号）+ 当前/预览方块
+DELTA = struct.Struct('<IIBQBBB')
+PIECE = struct.Struct('<BBHHB')  # 种类、旋转状态、x、y、颜色
+SNAPSHOT_EVERY = 64  # 每隔多少块附带一次快照，新观众只需补发其后的增量
+MAX_BUFFER = 1 << 20  # 发送缓冲积压超过这个字节数的观众直接断开
+
+
+def parse_address(address):
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit():
+        return host or '127.0.0.1', int(port)
+    return address
+
+
+def _is_socket(path):
+    try:
+        return stat.S_ISSOCK(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return False
+
+
+def encode_snapshot(engine):
+    board = engine.board
+    return b''.join([
+        b'S',
+        SNAPSHOT.pack(engine.width, engine.height, engine.score, engine.pieces,
+                      engine.game_over, board.zobrist),
+        PIECE.pack(*engine.current_piece),
+        PIECE.pack(*engine.next_piece),
+        *map(bytes, board.cells),
+    ])
+
+
+def encode_delta(engine, piece, rows):
+    cells = [v for y, x in piece.cells for v in (piece.x + x, piece.y + y)]
+    return b''.join([
+        b'D',
+        DELTA.pack(engine.score, engine.pieces, engine.game_over, engine.board.zobrist,
+                   piece.color, len(cells) // 2, len(rows)),
+        struct.pack(f'<{len(cells)}H', *cells),
+        struct.pack(f'<{len(rows)}H', *rows),
+        PIECE.pack(*engine.current_piece),
+        PIECE.pack(*engine.next_piece),
+    ])
+
+
+def _serve(address, messages):
+    # 观战进程：套接字读写都在这里，游戏进程只负责把编码好的消息放进队列
+    asyncio.run(_broadcast(address, messages))
+
+
+async def _broadcast(address, messages):
+    loop = asyncio.get_running_loop()
+    clients = set()
+    # 最近一次快照及其后的增量，新观众连上时先补发这些
+    latest = [b'']
+
+    async def connected(reader, writer):
+        writer.write(b''.join(latest))
+        clients.add(writer)
+        try:
+            # 观众不发数据，读到 EOF 即断开
+            await reader.read()
+        except (ConnectionError, asyncio.CancelledError):
+            # 关闭服务时仍连着的观众会在这里被取消
+            pass
+        finally:
+            clients.discard(writer)
+            writer.close()
+
+    address = parse_address(address)
+    if isinstance(address, tuple):
+        server = await asyncio.start_server(connected, *address)
+    else:
+        # 只清理上次留下的套接字文件，其他文件在 Spectators 里就已拒绝
+        if _is_socket(address):
+            os.unlink(address)
+        server = await asyncio.start_unix_server(connected, address)
+
+    async with server:
+        while True:
+            batch = [await loop.run_in_executor(None, messages.get)]
+            # 积压的消息合并成一次写入，加速模式下也只有少量系统调用
+            while batch[-1] is not None:
+                try:
+                    batch.append(messages.get_nowait())
+                except queue.Empty:
+                    break
+            done = batch[-1] is None
+            if done:
+                batch.pop()
+            for data, base in batch:
+                if base is None:
+                    latest.append(data)
+                else:
+                    latest = [base]
+            data = b''.join(data for data, _ in batch)
+            for writer in list(clients):
+                if writer.transport.get_write_buffer_size() > MAX_BUFFER:
+                    # 跟不上的观众断开，重连后从快照重新开始
+                    clients.discard(writer)
+                    writer.close()
+                elif data:
+                    writer.write(data)
+            if done:
+                return
+
+
+class Spectators:
+    """观战服务：作为引擎的 listener 把每块方块编码成增量消息，
+    交给后台进程广播，游戏循环不等待任何网络读写。"""
+
+    def __init__(self, address, snapshot_every=SNAPSHOT_EVERY):
+        # 写错的地址（比如漏了主机部分的 7777）会被当成套接字路径，
+        # 同名的普通文件不能被删掉
+        path = parse_address(address)
+        if isinstance(path, str) and os.path.exists(path) and not _is_socket(path):
+            raise ValueError(f'{path} 已存在且不是套接字；TCP 地址请写成 主机:端口')
+        self.snapshot_every = snapshot_every
+        self.locks = 0
+        context = multiprocessing.get_context('spawn')
+        self.messages = context.Queue()
+        self.process = context.Process(target=_serve, args=(address, self.messages), daemon=True)
+        self.process.start()
+
+    def attach(self, engine):
+        engine.listener = self
+        self.snapshot(engine)
+
+    def snapshot(self, engine):
+        data = encode_snapshot(engine)
+        self.locks = 0
+        self.messages.put((data, data))
+
+    def locked(self, engine, piece, rows):
+        self.locks += 1
+        base = None
+        if self.locks >= self.snapshot_every:
+            base = encode_snapshot(engine)
+            self.locks = 0
+        self.messages.put((encode_delta(engine, piece, rows), base))
+
+    def close(self):
+        self.messages.put(None)
+        self.process.join(timeout=1)
+
+
+class Mirror:
+    """观众端重建的棋盘：按消息更新，每条消息后用哈希核对，不一致时抛出 ValueError。"""
+
+    def __init__(self):
+        self.width = self.height = 0
+        self.cells = bytearray()
+        self.messages = 0
+        self.deltas = 0
+        self.delta_bytes = 0
+
+    def apply_snapshot(self, header, pieces, cells):
+        self.width, self.height, self.score, self.pieces, self.game_over, zobrist = header
+        self.current, self.next_piece = pieces
+        self.cells = bytearray(cells)
+        self.col_keys, self.row_keys = zobrist_keys(self.width, self.height)
+        width, col_keys = self.width, self.col_keys
+        self.row_sums = [sum(col_keys[x] for x in range(width) if cells[y*width + x])
+                         for y in range(self.height)]
+        self.messages += 1
+        self.verify(zobrist)
+
+    def apply_delta(self, header, cells, rows, pieces):
+        score, pieces_count, self.game_over, zobrist, color, _, _ = header
+        if pieces_count != self.pieces + 1:
+            raise ValueError(f'缺少消息：方块数从 {self.pieces} 跳到 {pieces_count}')
+        width, grid, row_sums = self.width, self.cells, self.row_sums
+        for i in range(0, len(cells), 2):
+            x, y = cells[i], cells[i+1]
+            if grid[y*width + x]:
+                raise ValueError(f'格子 ({x}, {y}) 已有方块')
+            grid[y*width + x] = color
+            row_sums[y] += self.col_keys[x]
+        for y in sorted(rows, reverse=True):
+            if 0 in grid[y*width:(y+1)*width]:
+                raise ValueError(f'第 {y} 行不是满行')
+            del grid[y*width:(y+1)*width]
+            del row_sums[y]
+        grid[0:0] = bytes(len(rows) * width)
+        row_sums[0:0] = [0] * len(rows)
+        self.score, self.pieces = score, pieces_count
+        self.current, self.next_piece = pieces
+        self.messages += 1
+        self.deltas += 1
+        self.verify(zobrist)
+
+    def verify(self, zobrist):
+        row_keys = self.row_keys
+        local = sum(row_keys[y] * s for y, s in enumerate(self.row_sums)) & MASK64
+        if local != zobrist:
+            raise ValueError(f'第 {self.pieces} 块后棋盘哈希不一致')
+
+
+async def connect(address, retry=5.0):
+    # 服务端可能还在启动，retry 秒内反复尝试
+    address = parse_address(address)
+    deadline = time.monotonic() + retry
+    while True:
+        try:
+            if isinstance(address, tuple):
+                return await asyncio.open_connection(*address)
+            return await asyncio.open_unix_connection(address)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+async def watch(address, messages=None, retry=5.0):
+    """连接观战服务并逐条核对，收到 messages 条消息或连接关闭时返回 Mirror。"""
+    reader, writer = await connect(address, retry)
+    mirror = Mirror()
+    try:
+        while messages is None or mirror.messages < messages:
+            try:
+                kind = await reader.readexactly(1)
+            except asyncio.IncompleteReadError:
+                break
+            if kind == b'S':
+                header = SNAPSHOT.unpack(await reader.readexactly(SNAPSHOT.size))
+                pieces = PIECE.iter_unpack(await reader.readexactly(2 * PIECE.size))
+                cells = await reader.readexactly(header[0] * header[1])
+                mirror.apply_snapshot(header, list(pieces), cells)
+            elif kind == b'D':
+                raw = await reader.readexactly(DELTA.size)
+                header = DELTA.unpack(raw)
+                n_cells, n_rows = header[-2:]
+                body = await reader.readexactly(4*n_cells + 2*n_rows + 2*PIECE.size)
+                cells = struct.unpack_from(f'<{2*n_cells}H', body)
+                rows = struct.unpack_from(f'<{n_rows}H', body, 4*n_cells)
+                pieces = PIECE.iter_unpack(body[4*n_cells + 2*n_rows:])
+                mirror.apply_delta(header, cells, rows, list(pieces))
+                mirror.delta_bytes += 1 + len(raw) + len(body)
+            else:
+                raise ValueError(f'未知消息类型 {kind!r}')
+    finally:
+        writer.close()
+    return mirror
+
+
+def serve_headless(address, rate):
+    # 无界面 AI 对局作为观战源，rate 为每秒放置的方块数（0 为全速）
+    spectators = Spectators(address)
+    engine = TetrisEngine(board='bit')
+    spectators.attach(engine)
+    try:
+        while True:
+            best = engine.ai_search()
+            if best is None:
+                engine.end_game()
+            if engine.game_over:
+                engine.reset()
+                continue
+            engine.place(*best)
+            if rate:
+                time.sleep(1 / rate)
+    finally:
+        spectators.close()
+
+
+async def watch_many(address, clients, messages):
+    start = time.perf_counter()
+    results = await asyncio.gather(*(watch(address, messages) for _ in range(clients)),
+                                   return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    failed = 0
+    for i, result in enumerate(results):
+        if isinstance(result, Exception):
+            failed += 1
+            print(f'观众 {i}: {type(result).__name__}: {result}')
+            continue
+        per_delta = result.delta_bytes / result.deltas if result.deltas else 0
+        print(f'观众 {i}: {result.messages} 条消息 已核对, 方块 {result.pieces}, '
+              f'得分 {result.score}, 增量平均 {per_delta:.0f} 字节')
+    print(f'{clients - failed}/{clients} 个观众核对通过, 用时 {elapsed:.1f}s')
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对局观战：广播增量消息或作为观众核对')
+    parser.add_argument('address', help='主机:端口 或 Unix 套接字路径')
+    parser.add_argument('--serve', action='store_true', help='无界面 AI 对局作为观战源')
+    parser.add_argument('--rate', type=float, default=0, help='--serve 时每秒放置的方块数，0 为全速')
+    parser.add_argument('--clients', type=int, default=1, help='同时连接的观众数')
+    parser.add_argument('--messages', type=int, default=500, help='每个观众收到多少条消息后退出')
+    args = parser.parse_args()
+
+    if args.serve:
+        try:
+            serve_headless(args.address, args.rate)
+        except KeyboardInterrupt:
+            pass
+        return
+    if asyncio.run(watch_many(args.address, args.clients, args.messages)):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
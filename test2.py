@@ -1,13 +1,17 @@
-import pygame
-import random
+import argparse
+import math
 import time
 
+import pygame
+
+from engine import TetrisEngine, WIDTH, HEIGHT
+from render import Renderer
+
 # 游戏参数
 BLOCK_SIZE = 40
 BORDER = 3
-WIDTH = 10
-HEIGHT = 20
 FPS = 60
+DROP_INTERVAL = 0.5  # 自动下落间隔（秒）
 PREVIEW_SIZE = BLOCK_SIZE * 4
 BUTTON_RADIUS = BLOCK_SIZE  # 按钮半径
 
@@ -31,19 +35,21 @@ BUTTONS = {
     'down': (WIDTH*BLOCK_SIZE + BLOCK_SIZE*4, HEIGHT*BLOCK_SIZE - BLOCK_SIZE*3)
 }
 
-# 方块形状
-SHAPES = [
-    {"shape": [[1,1,1,1]], "preview_offset": (1, 2)},   # I
-    {"shape": [[1,1],[1,1]], "preview_offset": (1, 1)},  # O
-    {"shape": [[1,1,1],[0,1,0]], "preview_offset": (1, 1)},  # T
-    {"shape": [[1,1,1],[1,0,0]], "preview_offset": (1, 1)},  # L
-    {"shape": [[1,1,1],[0,0,1]], "preview_offset": (1, 1)},  # J
-    {"shape": [[1,1,0],[0,1,1]], "preview_offset": (1, 1)},  # S
-    {"shape": [[0,1,1],[1,1,0]], "preview_offset": (1, 1)}   # Z
-]
+# 各按钮的触控区域，只在导入时建一次
+BUTTON_RECTS = {name: pygame.Rect(x - BUTTON_RADIUS, y - BUTTON_RADIUS, BUTTON_RADIUS*2, BUTTON_RADIUS*2)
+                for name, (x, y) in BUTTONS.items()}
+
+# 所有按钮（含 2 像素外圈）所在的区域
+BUTTON_PANEL = BUTTON_RECTS['rotate'].unionall(list(BUTTON_RECTS.values())).inflate(4, 4)
 
-class Tetris:
-    def __init__(self):
+# 下一个方块预览位置（格）与预览框
+PREVIEW_X = WIDTH + 1
+PREVIEW_Y = 2
+PREVIEW_BOX = (PREVIEW_X*BLOCK_SIZE-10, PREVIEW_Y*BLOCK_SIZE-10, PREVIEW_SIZE+20, PREVIEW_SIZE+20)
+
+class Tetris(TetrisEngine):
+    def __init__(self, event_driven=True):
+        # event_driven: 没有输入、也没到下落时间时阻塞等待，不按 FPS 空转
         pygame.init()
         self.screen = pygame.display.set_mode((
             BLOCK_SIZE*(WIDTH+7), 
@@ -51,83 +57,36 @@ class Tetris:
         ))
         pygame.display.set_caption("触控俄罗斯方块")
         self.clock = pygame.time.Clock()
-        self.reset_game()
+        super().__init__()
+        self.event_driven = event_driven
+        self.last_drop = time.monotonic()
         self.touch_down = False
+        # 字体、按钮图层只创建一次
+        self.font = pygame.font.SysFont('notosanssc', 24, bold=True)
+        self.over_font = pygame.font.SysFont('notosanssc', 32, bold=True)
+        self.button_panels = {pressed: self.draw_button_panel(pressed) for pressed in (False, True)}
+        self.renderer = Renderer(self.screen, BLOCK_SIZE, BORDER, COLORS, WIDTH, HEIGHT)
+        self.renderer.set_background(self.renderer.draw_background(PREVIEW_BOX))
 
     def reset_game(self):
-        self.game_board = [[0]*WIDTH for _ in range(HEIGHT)]
-        self.score = 0
-        self.current_piece = self.new_piece()
-        self.next_piece = self.new_piece()
-        self.game_over = False
-        self.last_drop = time.time()
-
-    # 新增缺失的方法
-    def new_piece(self):
-        shape_data = random.choice(SHAPES)
-        return {
-            "shape": shape_data["shape"],
-            "preview_offset": shape_data["preview_offset"],
-            "color": random.randint(1, len(COLORS)-1),
-            "x": WIDTH//2 - len(shape_data["shape"][0])//2,
-            "y": 0
-        }
-
-    def check_collision(self, piece, dx=0, dy=0):
-        for y, row in enumerate(piece['shape']):
-            for x, cell in enumerate(row):
-                if cell:
-                    new_x = piece['x'] + x + dx
-                    new_y = piece['y'] + y + dy
-                    if new_x < 0 or new_x >= WIDTH or new_y >= HEIGHT:
-                        return True
-                    if new_y >= 0 and self.game_board[new_y][new_x]:
-                        return True
-        return False
-
-    def rotate_piece(self):
-        rotated = [list(row) for row in zip(*reversed(self.current_piece['shape']))]
-        old_shape = self.current_piece['shape']
-        self.current_piece['shape'] = rotated
-        if self.check_collision(self.current_piece):
-            self.current_piece['shape'] = old_shape
-
-    def lock_piece(self):
-        for y, row in enumerate(self.current_piece['shape']):
-            for x, cell in enumerate(row):
-                if cell:
-                    self.game_board[y + self.current_piece['y']][x + self.current_piece['x']] = self.current_piece['color']
-        
-        lines_cleared = 0
-        for y in range(HEIGHT):
-            if 0 not in self.game_board[y]:
-                del self.game_board[y]
-                self.game_board.insert(0, [0]*WIDTH)
-                lines_cleared += 1
-        
-        if lines_cleared > 0:
-            self.score += 100 * (2 ** lines_cleared)
-
-    def draw_block(self, x, y, color, is_preview=False):
-        border = BORDER * 2 if is_preview else BORDER
-        pygame.draw.rect(self.screen, COLORS[color],
-                        (x*BLOCK_SIZE + border, y*BLOCK_SIZE + border,
-                         BLOCK_SIZE - 2*border, BLOCK_SIZE - 2*border))
-        if color != 0:
-            pygame.draw.line(self.screen, (255,255,255), 
-                            (x*BLOCK_SIZE, y*BLOCK_SIZE),
-                            (x*BLOCK_SIZE + BLOCK_SIZE, y*BLOCK_SIZE), 2)
-            pygame.draw.line(self.screen, (255,255,255),
-                            (x*BLOCK_SIZE, y*BLOCK_SIZE),
-                            (x*BLOCK_SIZE, y*BLOCK_SIZE + BLOCK_SIZE), 2)
-
-    def draw_button(self, name, pos):
+        self.reset()
+        self.last_drop = time.monotonic()
+        self.renderer.invalidate()
+
+    def draw_button_panel(self, pressed):
+        # 四个按钮画在一张透明图层上，按下和松开各一张
+        panel = pygame.Surface(BUTTON_PANEL.size, pygame.SRCALPHA)
+        for name, (x, y) in BUTTONS.items():
+            self.draw_button(panel, name, (x - BUTTON_PANEL.x, y - BUTTON_PANEL.y), pressed)
+        return panel
+
+    def draw_button(self, surface, name, pos, pressed):
         x, y = pos
         center = (x, y)
-        color = (200, 200, 200) if not self.touch_down else (150, 150, 150)
+        color = (200, 200, 200) if not pressed else (150, 150, 150)
         
-        pygame.draw.circle(self.screen, (50,50,50), center, BUTTON_RADIUS+2)
-        pygame.draw.circle(self.screen, color, center, BUTTON_RADIUS)
+        pygame.draw.circle(surface, (50,50,50), center, BUTTON_RADIUS+2)
+        pygame.draw.circle(surface, color, center, BUTTON_RADIUS)
         
         arrow_color = (40, 40, 40)
         line_width = 4
@@ -145,10 +104,10 @@ class Tetris:
                 (center[0] - 5, center[1] + 12)
             ]
         elif name == 'rotate':
-            pygame.draw.arc(self.screen, arrow_color, 
+            pygame.draw.arc(surface, arrow_color, 
                            (center[0]-15, center[1]-15, 30, 30),
                            0.5, 5.5, line_width)
-            pygame.draw.polygon(self.screen, arrow_color, [
+            pygame.draw.polygon(surface, arrow_color, [
                 (center[0]+10, center[1]-10),
                 (center[0]+15, center[1]-15),
                 (center[0]+5, center[1]-20)
@@ -161,117 +120,99 @@ class Tetris:
             ]
         
         if name in ['left', 'right', 'down']:
-            pygame.draw.polygon(self.screen, arrow_color, points)
-        
-        return pygame.Rect(x-BUTTON_RADIUS, y-BUTTON_RADIUS, BUTTON_RADIUS*2, BUTTON_RADIUS*2)
+            pygame.draw.polygon(surface, arrow_color, points)
 
     def handle_touch(self, pos):
-        for name, btn_pos in BUTTONS.items():
-            btn_rect = pygame.Rect(
-                btn_pos[0]-BUTTON_RADIUS, 
-                btn_pos[1]-BUTTON_RADIUS,
-                BUTTON_RADIUS*2, 
-                BUTTON_RADIUS*2
-            )
-            if btn_rect.collidepoint(pos):
-                if name == 'left' and not self.check_collision(self.current_piece, dx=-1):
-                    self.current_piece['x'] -= 1
-                elif name == 'right' and not self.check_collision(self.current_piece, dx=1):
-                    self.current_piece['x'] += 1
-                elif name == 'rotate':
-                    self.rotate_piece()
-                elif name == 'down':
-                    self.current_piece['y'] += 1
+        for name, rect in BUTTON_RECTS.items():
+            if rect.collidepoint(pos):
+                self.step(name)
                 return True
         return False
 
+    def handle_event(self, event):
+        # 处理一个输入事件，返回画面是否可能变化
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            self.touch_down = True
+            self.handle_touch(event.pos)
+        elif event.type == pygame.MOUSEBUTTONUP:
+            self.touch_down = False
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_r and self.game_over:
+            self.reset_game()
+        elif event.type == pygame.WINDOWEXPOSED:
+            # 窗口被遮挡后重新露出，整屏重画
+            self.renderer.invalidate()
+        else:
+            return False
+        return True
+
+    def fall(self):
+        # 到了下落时间就下落一格，返回是否下落
+        if self.game_over or time.monotonic() - self.last_drop < DROP_INTERVAL:
+            return False
+        self.step('down')
+        self.last_drop = time.monotonic()
+        return True
+
+    def wait_events(self):
+        # 没有待处理的事件时一直睡到下一次自动下落（游戏结束后睡到有输入为止），
+        # 输入事件一到就立即醒来
+        events = pygame.event.get()
+        if events:
+            return events
+        if self.game_over:
+            return [pygame.event.wait()]
+        timeout = self.last_drop + DROP_INTERVAL - time.monotonic()
+        if timeout <= 0:
+            return []
+        event = pygame.event.wait(math.ceil(timeout * 1000))
+        return [] if event.type == pygame.NOEVENT else [event]
+
+    def draw(self):
+        # 绘制界面（只重画变化的部分）
+        self.renderer.draw_preview(self.next_piece, PREVIEW_X, PREVIEW_Y, PREVIEW_BOX)
+        self.renderer.draw_board(self.game_board, None if self.game_over else self.current_piece)
+        self.renderer.text('score', f'分数: {self.score}', self.font, (BLOCK_SIZE*(WIDTH+1), 20))
+
+        # 绘制控制按钮
+        self.renderer.blit('buttons', self.button_panels[self.touch_down], BUTTON_PANEL.topleft)
+
+        # 游戏结束提示
+        if self.game_over:
+            self.renderer.text('over', '游戏结束 - 点击重开', self.over_font,
+                               (BLOCK_SIZE, BLOCK_SIZE*HEIGHT//2 - 20))
+
+        self.renderer.update()
+
     def run(self):
+        # 事件驱动模式下只有输入或自动下落改变了状态才重画；
+        # 否则与原来一样按 FPS 轮询、每帧都画
+        if self.event_driven:
+            # 移动事件不影响游戏，屏蔽掉免得把循环唤醒
+            pygame.event.set_blocked([pygame.MOUSEMOTION, pygame.FINGERMOTION])
+        changed = True
         while True:
-            delta_time = self.clock.tick(FPS)/1000.0
-            self.touch_down = False
-            
-            for event in pygame.event.get():
+            if self.event_driven:
+                events = self.wait_events()
+            else:
+                self.clock.tick(FPS)
+                events = pygame.event.get()
+
+            for event in events:
                 if event.type == pygame.QUIT:
                     pygame.quit()
                     return
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    self.touch_down = True
-                    self.handle_touch(pygame.mouse.get_pos())
-                elif event.type == pygame.MOUSEBUTTONUP:
-                    self.touch_down = False
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_r and self.game_over:
-                        self.reset_game()
+                changed |= self.handle_event(event)
 
             # 自动下落逻辑
-            if not self.game_over and time.time() - self.last_drop > 0.5:
-                if not self.check_collision(self.current_piece, dy=1):
-                    self.current_piece['y'] += 1
-                    self.last_drop = time.time()
-                else:
-                    self.lock_piece()
-                    self.current_piece = self.next_piece
-                    self.next_piece = self.new_piece()
-                    self.last_drop = time.time()
-                    if self.check_collision(self.current_piece):
-                        self.game_over = True
+            changed |= self.fall()
 
-            # 绘制界面
-            self.screen.fill(COLORS[0])
-            
-            # 绘制游戏区域边框
-            pygame.draw.rect(self.screen, (100,100,100), 
-                           (0, 0, BLOCK_SIZE*WIDTH, BLOCK_SIZE*HEIGHT), 3)
-            
-            # 绘制预览区域
-            preview_x = WIDTH + 1
-            preview_y = 2
-            pygame.draw.rect(self.screen, (80,80,80), 
-                           (preview_x*BLOCK_SIZE-10, preview_y*BLOCK_SIZE-10, 
-                            PREVIEW_SIZE+20, PREVIEW_SIZE+20), 0)
-            ox, oy = self.next_piece['preview_offset']
-            for y, row in enumerate(self.next_piece['shape']):
-                for x, cell in enumerate(row):
-                    if cell:
-                        self.draw_block(
-                            preview_x + x + ox, 
-                            preview_y + y + oy, 
-                            self.next_piece['color'], 
-                            is_preview=True
-                        )
-            
-            # 绘制游戏板
-            for y in range(HEIGHT):
-                for x in range(WIDTH):
-                    if self.game_board[y][x]:
-                        self.draw_block(x, y, self.game_board[y][x])
-            
-            # 绘制当前方块
-            if not self.game_over:
-                for y, row in enumerate(self.current_piece['shape']):
-                    for x, cell in enumerate(row):
-                        if cell:
-                            self.draw_block(x + self.current_piece['x'], 
-                                         y + self.current_piece['y'], 
-                                         self.current_piece['color'])
-            
-            # 绘制分数
-            font = pygame.font.SysFont('notosanssc', 24, bold=True)
-            score_text = font.render(f'分数: {self.score}', True, (255,255,255))
-            self.screen.blit(score_text, (BLOCK_SIZE*(WIDTH+1), 20))
-            
-            # 绘制控制按钮
-            for name, pos in BUTTONS.items():
-                self.draw_button(name, pos)
-            
-            # 游戏结束提示
-            if self.game_over:
-                over_font = pygame.font.SysFont('notosanssc', 32, bold=True)
-                over_text = over_font.render('游戏结束 - 点击重开', True, (255,255,255))
-                self.screen.blit(over_text, (BLOCK_SIZE, BLOCK_SIZE*HEIGHT//2 - 20))
-            
-            pygame.display.update()
+            if changed or not self.event_driven:
+                self.draw()
+                changed = False
 
 if __name__ == '__main__':
-    game = Tetris()
+    parser = argparse.ArgumentParser(description='触控俄罗斯方块')
+    parser.add_argument('--poll', action='store_true', help='按 FPS 轮询重画（默认空闲时阻塞等待事件）')
+    args = parser.parse_args()
+    game = Tetris(event_driven=not args.poll)
     game.run()
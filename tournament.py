@@ -0,0 +1,194 @@
+import argparse
+import csv
+import json
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from engine import TetrisEngine
+from tune import save_json
+
+# AI 配置对比赛：python tournament.py --games 200 --output results.jsonl
+# 每个配置在同一组种子上各下若干局（多进程并行），每局结束立即追加一行到
+# JSONL（可选同时写 CSV），结果文件本身就是检查点：中断后用相同参数重跑，
+# 已完成的 (配置, 种子) 会跳过。汇总只保留累计量，内存占用与局数无关。
+
+# 默认参赛配置，可用 --configs 指定 JSON 文件 {名称: TetrisEngine 参数}
+CONFIGS = {
+    'greedy': {'board': 'bit'},
+    'lookahead': {'board': 'bit', 'depth': 2, 'beam_width': 4, 'cache_size': 65536},
+}
+
+FIELDS = ['config', 'seed', 'score', 'lines', 'pieces', 'seconds', 'ms_per_move', 'max_ms_per_move']
+
+
+def play_game(name, options, seed, max_pieces):
+    # 工作进程中执行：下完一局，返回这一局的结果
+    engine = TetrisEngine(seed=seed, **options)
+    lines = 0
+    total = 0.0
+    slowest = 0.0
+    start = time.perf_counter()
+    while not engine.game_over and engine.pieces < max_pieces:
+        t = time.perf_counter()
+        best = engine.ai_search()
+        elapsed = time.perf_counter() - t
+        total += elapsed
+        slowest = max(slowest, elapsed)
+        if best is None:
+            engine.end_game()
+            break
+        lines += engine.place(*best)
+    moves = max(engine.pieces, 1)
+    return {
+        'config': name,
+        'seed': seed,
+        'score': engine.score,
+        'lines': lines,
+        'pieces': engine.pieces,
+        'seconds': round(time.perf_counter() - start, 4),
+        'ms_per_move': round(total / moves * 1000, 4),
+        'max_ms_per_move': round(slowest * 1000, 4),
+    }
+
+
+class Stats:
+    """单个配置的累计统计（只保存总和，不保存每局结果）。"""
+
+    def __init__(self):
+        self.games = 0
+        self.sums = {key: 0.0 for key in FIELDS[2:]}
+        self.score_sq = 0.0
+        self.min_score = None
+        self.max_score = None
+
+    def add(self, result):
+        self.games += 1
+        for key in self.sums:
+            self.sums[key] += result[key]
+        score = result['score']
+        self.score_sq += score * score
+        self.min_score = score if self.min_score is None else min(self.min_score, score)
+        self.max_score = score if self.max_score is None else max(self.max_score, score)
+
+    def summary(self):
+        n = self.games
+        means = {key: total / n for key, total in self.sums.items()}
+        variance = max(self.score_sq / n - means['score'] ** 2, 0.0) * n / max(n - 1, 1)
+        std = math.sqrt(variance)
+        return {
+            'games': n,
+            'mean_score': means['score'],
+            'std_score': std,
+            # 平均分的 95% 置信区间半宽
+            'ci95_score': 1.96 * std / math.sqrt(n),
+            'min_score': self.min_score,
+            'max_score': self.max_score,
+            'mean_lines': means['lines'],
+            'mean_pieces': means['pieces'],
+            'ms_per_move': means['ms_per_move'],
+            'total_seconds': self.sums['seconds'],
+        }
+
+
+def summarize(stats):
+    return {name: s.summary() for name, s in stats.items() if s.games}
+
+
+def load_done(path, stats):
+    # 逐行读取已有结果：记下完成的 (配置, 种子) 并计入统计；
+    # 中断时可能留下半行，跳过即可
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            key = (result['config'], result['seed'])
+            if key in done or result['config'] not in stats:
+                continue
+            done.add(key)
+            stats[result['config']].add(result)
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多个 AI 配置在相同种子上对比')
+    parser.add_argument('--configs', help='JSON 文件：{名称: TetrisEngine 参数}')
+    parser.add_argument('--games', type=int, default=100, help='每个配置的对局数')
+    parser.add_argument('--seed', type=int, default=0, help='第一局的种子，之后依次加一')
+    parser.add_argument('--max-pieces', type=int, default=1000, help='每局最多放置的方块数')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--output', default='results.jsonl', help='逐局结果（兼作检查点）')
+    parser.add_argument('--csv', help='同时把逐局结果写成 CSV')
+    parser.add_argument('--summary', default='summary.json', help='各配置的汇总统计')
+    args = parser.parse_args()
+
+    configs = CONFIGS
+    if args.configs:
+        with open(args.configs, encoding='utf-8') as f:
+            configs = json.load(f)
+    stats = {name: Stats() for name in configs}
+    done = load_done(args.output, stats)
+    if done:
+        print(f'从 {args.output} 继续：已完成 {len(done)} 局')
+
+    # 同一种子的各配置相邻，中途停下时各配置的局数也大致相同
+    jobs = ((name, options, seed)
+            for seed in range(args.seed, args.seed + args.games)
+            for name, options in configs.items()
+            if (name, seed) not in done)
+    total = args.games * len(configs)
+    finished = len(done)
+
+    new_csv = args.csv and not os.path.exists(args.csv)
+    with open(args.output, 'a', encoding='utf-8') as out, \
+            open(args.csv or os.devnull, 'a', newline='', encoding='utf-8') as csv_file, \
+            ProcessPoolExecutor(max_workers=args.workers) as pool:
+        writer = csv.DictWriter(csv_file, FIELDS)
+        if new_csv:
+            writer.writeheader()
+        # 同时在跑的对局不超过工作进程数的两倍，任务不会一次性全部堆进内存
+        pending = set()
+        last_report = time.perf_counter()
+        try:
+            while True:
+                for name, options, seed in jobs:
+                    pending.add(pool.submit(play_game, name, options, seed, args.max_pieces))
+                    if len(pending) >= args.workers * 2:
+                        break
+                if not pending:
+                    break
+                finished_now, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished_now:
+                    result = future.result()
+                    out.write(json.dumps(result) + '\n')
+                    writer.writerow(result)
+                    stats[result['config']].add(result)
+                    finished += 1
+                out.flush()
+                csv_file.flush()
+                if time.perf_counter() - last_report > 10:
+                    last_report = time.perf_counter()
+                    print(f'{finished}/{total} 局')
+                    save_json(args.summary, summarize(stats))
+        except KeyboardInterrupt:
+            print(f'已中断（{finished}/{total} 局），用相同参数重跑即可继续')
+            return
+        finally:
+            for future in pending:
+                future.cancel()
+            save_json(args.summary, summarize(stats))
+
+    for name, summary in summarize(stats).items():
+        print(f"{name:<12} {summary['games']:>5} 局  平均 {summary['mean_score']:>9.1f} "
+              f"± {summary['ci95_score']:.1f}  消行 {summary['mean_lines']:.1f}  "
+              f"{summary['ms_per_move']:.2f} ms/步")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+import argparse
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import DEFAULT_WEIGHTS, TetrisEngine
+
+# 评估权重自对弈调参：python tune.py --generations 30 --output weights.json
+# 每一代的候选权重在同一组种子上无界面对局（多进程并行），
+# 用简单的进化策略（精英保留 + 交叉 + 对数正态变异）迭代，
+# 每代结束写检查点，中断后用相同参数再次运行即可继续。
+
+NAMES = list(DEFAULT_WEIGHTS)
+
+
+def play_game(weights, seed, max_pieces):
+    # 工作进程中执行：固定种子下完整下一局，返回得分
+    engine = TetrisEngine(board='bit', weights=weights, seed=seed)
+    engine.play(max_pieces=max_pieces)
+    return engine.score
+
+
+def mutate(rng, weights, sigma):
+    # 在对数空间扰动，保证权重始终为正
+    return {k: v * math.exp(rng.gauss(0, sigma)) for k, v in weights.items()}
+
+
+def crossover(rng, a, b):
+    return {k: a[k] if rng.random() < 0.5 else b[k] for k in NAMES}
+
+
+def next_generation(rng, ranked, size, elite, sigma):
+    # ranked: 按适应度从高到低排好的权重
+    parents = ranked[:max(elite, 2)]
+    population = [dict(w) for w in ranked[:elite]]
+    while len(population) < size:
+        a, b = rng.sample(parents, 2)
+        population.append(mutate(rng, crossover(rng, a, b), sigma))
+    return population
+
+
+def evaluate(pool, population, seeds, max_pieces):
+    # 所有 (候选, 种子) 组合一起提交，核数越多越快
+    futures = [[pool.submit(play_game, w, seed, max_pieces) for seed in seeds]
+               for w in population]
+    return [sum(f.result() for f in row) / len(row) for row in futures]
+
+
+def save_json(path, data):
+    # 先写临时文件再替换，避免中断时留下损坏的文件
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        state = json.load(f)
+    version, internal, gauss = state['rng']
+    state['rng'] = (version, tuple(internal), gauss)
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(description='自对弈调节 evaluate_position 的权重')
+    parser.add_argument('--generations', type=int, default=20)
+    parser.add_argument('--population', type=int, default=16)
+    parser.add_argument('--elite', type=int, default=4)
+    parser.add_argument('--games', type=int, default=8, help='每个候选的对局数')
+    parser.add_argument('--max-pieces', type=int, default=500, help='每局最多放置的方块数')
+    parser.add_argument('--sigma', type=float, default=0.3, help='对数空间变异幅度')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--checkpoint', default='tune_checkpoint.json')
+    parser.add_argument('--output', default='weights.json')
+    args = parser.parse_args()
+
+    state = load_checkpoint(args.checkpoint)
+    rng = random.Random(args.seed)
+    if state:
+        rng.setstate(state['rng'])
+        generation = state['generation']
+        population = state['population']
+        best = state['best']
+        print(f'从检查点继续：第 {generation} 代')
+    else:
+        generation = 0
+        population = [dict(DEFAULT_WEIGHTS)]
+        population += [mutate(rng, DEFAULT_WEIGHTS, args.sigma) for _ in range(args.population - 1)]
+        best = {'fitness': -float('inf'), 'weights': dict(DEFAULT_WEIGHTS)}
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        while generation < args.generations:
+            start = time.perf_counter()
+            # 每代换一组种子，同一代内所有候选共用种子以便公平比较
+            seeds = [rng.getrandbits(32) for _ in range(args.games)]
+            fitness = evaluate(pool, population, seeds, args.max_pieces)
+            order = sorted(range(len(population)), key=lambda i: fitness[i], reverse=True)
+            ranked = [population[i] for i in order]
+            if fitness[order[0]] > best['fitness']:
+                best = {'fitness': fitness[order[0]], 'weights': ranked[0]}
+                save_json(args.output, best)
+
+            generation += 1
+            elapsed = time.perf_counter() - start
+            print(f'第 {generation} 代: 最佳 {fitness[order[0]]:.0f}  '
+                  f'平均 {sum(fitness) / len(fitness):.0f}  历史最佳 {best["fitness"]:.0f}  '
+                  f'{elapsed:.1f}s')
+
+            population = next_generation(rng, ranked, args.population, args.elite, args.sigma)
+            if args.checkpoint:
+                save_json(args.checkpoint, {
+                    'generation': generation,
+                    'population': population,
+                    'best': best,
+                    'rng': rng.getstate(),
+                })
+
+    print(f'最佳权重已保存到 {args.output}: {best["weights"]}')
+
+
+if __name__ == '__main__':
+    main()
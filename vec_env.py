@@ -0,0 +1,148 @@
+import numpy as np
+
+from engine import COLOR_COUNT, HEIGHT, ROTATIONS, SHAPES, WIDTH
+
+# 向量化多局环境（需要 numpy）：N 局的棋盘存成一个 (N, 高, 宽) 的 uint8 数组，
+# 当前/预览方块、得分、结束标记都是长度 N 的数组，一次 step 同时推进所有对局。
+# 规则与 TetrisEngine.place 相同：转到指定旋转状态、移到指定列后直接落下，
+# 出生位置就碰撞（含越界）即结束；消行得分 100 * 2^行数。
+# 每局约占 200 字节棋盘 + 十几字节状态。
+#
+#   env = VecEnv(4096, seed=0)
+#   lines = env.step(rotations, xs)   # 已结束的对局忽略动作
+
+KINDS = len(SHAPES)
+
+
+def _tables():
+    # 每种 (方块, 旋转) 的 4 个方块格偏移、宽度、每列底部行号，
+    # 旋转序号按该方块的状态数取模，统一成 4 个
+    cells = np.zeros((KINDS, 4, 4, 2), dtype=np.int64)
+    widths = np.zeros((KINDS, 4), dtype=np.int64)
+    # 未用到的列底部记为一个很小的数，算落点时不会成为最小值
+    bottoms = np.full((KINDS, 4, 4), -(1 << 30), dtype=np.int64)
+    for kind, states in enumerate(ROTATIONS):
+        for r in range(4):
+            state = states[r % len(states)]
+            cells[kind, r] = [(y, x) for y, row in enumerate(state.shape)
+                              for x, cell in enumerate(row) if cell]
+            widths[kind, r] = state.width
+            bottoms[kind, r, :state.width] = state.bottom
+    return cells, widths, bottoms
+
+
+CELLS, WIDTHS, BOTTOMS = _tables()
+SHAPE_WIDTHS = np.array([len(s["shape"][0]) for s in SHAPES])
+
+
+class VecEnv:
+    def __init__(self, n, seed=None, width=WIDTH, height=HEIGHT):
+        self.n = n
+        self.width = width
+        self.height = height
+        self.spawn_x = width//2 - SHAPE_WIDTHS//2
+        self.rng = np.random.default_rng(seed)
+        self.boards = np.zeros((n, height, width), dtype=np.uint8)
+        self.kinds = np.zeros(n, dtype=np.uint8)
+        self.colors = np.zeros(n, dtype=np.uint8)
+        self.next_kinds = np.zeros(n, dtype=np.uint8)
+        self.next_colors = np.zeros(n, dtype=np.uint8)
+        self.scores = np.zeros(n, dtype=np.int64)
+        self.pieces = np.zeros(n, dtype=np.int32)
+        self.game_over = np.zeros(n, dtype=bool)
+        self.reset()
+
+    def _draw(self, count):
+        return (self.rng.integers(0, KINDS, count, dtype=np.uint8),
+                self.rng.integers(1, COLOR_COUNT + 1, count, dtype=np.uint8))
+
+    def reset(self, index=None):
+        # index 为 None 时重开全部对局，否则只重开指定的（布尔掩码或下标数组）
+        index = np.arange(self.n) if index is None else np.arange(self.n)[index]
+        count = len(index)
+        self.boards[index] = 0
+        self.scores[index] = 0
+        self.pieces[index] = 0
+        self.game_over[index] = False
+        self.kinds[index], self.colors[index] = self._draw(count)
+        self.next_kinds[index], self.next_colors[index] = self._draw(count)
+
+    def heights(self, boards=None):
+        boards = self.boards if boards is None else boards
+        filled = boards != 0
+        return np.where(filled.any(axis=1), self.height - filled.argmax(axis=1), 0)
+
+    def landing_rows(self, kinds, rotations, xs, heights):
+        # 与 TetrisEngine.landing_row 相同；越界的列返回 -1
+        cols = xs[:, None] + np.arange(4)
+        column_heights = np.take_along_axis(heights, np.clip(cols, 0, self.width - 1), axis=1)
+        ys = (self.height - 1 - column_heights - BOTTOMS[kinds, rotations]).min(axis=1)
+        inside = (xs >= 0) & (xs + WIDTHS[kinds, rotations] <= self.width)
+        return np.where(inside, ys, -1)
+
+    def probe_rows(self, boards, kinds, rotations, xs):
+        # 从出生行（第 0 行）逐行下落的落点，与 TetrisEngine.drop_row 相同；
+        # 出生行就碰撞（含越界）时返回 -1。一次检查所有行，只用于列高不适用的少数对局
+        offsets = CELLS[kinds, rotations]
+        # 多试一行（第 height 行整块出界），保证每局都有碰撞的行
+        rows = np.arange(self.height + 1)[None, :, None] + offsets[:, None, :, 0]
+        cols = np.broadcast_to((xs[:, None] + offsets[..., 1])[:, None, :], rows.shape)
+        inside = (rows < self.height) & (cols >= 0) & (cols < self.width)
+        cells = boards[np.arange(len(xs))[:, None, None],
+                       np.minimum(rows, self.height - 1), np.clip(cols, 0, self.width - 1)]
+        hit = ((cells != 0) | ~inside).any(axis=2)
+        return hit.argmax(axis=1) - 1
+
+    def step(self, rotations, xs):
+        """所有未结束的对局各放置一块，返回每局消除的行数。"""
+        rotations = np.asarray(rotations, dtype=np.int64) % 4
+        xs = np.asarray(xs, dtype=np.int64)
+        lines = np.zeros(self.n, dtype=np.int64)
+
+        live = np.flatnonzero(~self.game_over)
+        kinds = self.kinds[live].astype(np.int64)
+        ys = self.landing_rows(kinds, rotations[live], xs[live], self.heights(self.boards[live]))
+        # 列高算出的落点在出生行之上：方块可能要钻到悬空方块下面，逐行试探
+        probe = ys < 0
+        if probe.any():
+            ys[probe] = self.probe_rows(self.boards[live[probe]], kinds[probe],
+                                        rotations[live][probe], xs[live][probe])
+        # 出生位置就碰撞：本局结束，方块不锁定
+        blocked = ys < 0
+        self.game_over[live[blocked]] = True
+        live, kinds, ys = live[~blocked], kinds[~blocked], ys[~blocked]
+        if not len(live):
+            return lines
+
+        # 锁定：每块正好 4 格
+        offsets = CELLS[kinds, rotations[live]]
+        self.boards[live[:, None], ys[:, None] + offsets[..., 0], xs[live][:, None] + offsets[..., 1]] = \
+            self.colors[live][:, None]
+
+        # 消行：满行稳定排序到顶部后清零，其余行保持原有顺序
+        full = (self.boards[live] != 0).all(axis=2)
+        counts = full.sum(axis=1)
+        cleared = live[counts > 0]
+        if len(cleared):
+            full, counts = full[counts > 0], counts[counts > 0]
+            order = np.argsort(~full, axis=1, kind='stable')
+            boards = np.take_along_axis(self.boards[cleared], order[:, :, None], axis=1)
+            boards[np.arange(self.height) < counts[:, None]] = 0
+            self.boards[cleared] = boards
+            lines[cleared] = counts
+            self.scores[cleared] += 100 * 2 ** counts
+
+        # 换上预览方块，出生即碰撞则结束
+        self.pieces[live] += 1
+        self.kinds[live], self.colors[live] = self.next_kinds[live], self.next_colors[live]
+        self.next_kinds[live], self.next_colors[live] = self._draw(len(live))
+        spawn = CELLS[self.kinds[live].astype(np.int64), 0]
+        xs = self.spawn_x[self.kinds[live]][:, None] + spawn[..., 1]
+        self.game_over[live] = (self.boards[live[:, None], spawn[..., 0], xs] != 0).any(axis=1)
+        return lines
+
+    def nbytes(self):
+        # 每局平均占用的字节数
+        arrays = (self.boards, self.kinds, self.colors, self.next_kinds, self.next_colors,
+                  self.scores, self.pieces, self.game_over)
+        return sum(a.nbytes for a in arrays) / self.n
@@ -0,0 +1,56 @@
+import numpy as np
+
+# 一次性对当前方块的所有候选落点打分（需要 numpy）
+
+
+def landing_boards(cells, placements):
+    # cells: 当前棋盘（颜色列表），placements: [(shape, x, y), ...]
+    # 返回形状为 (候选数, 高, 宽) 的布尔数组，每层是一个落点后的棋盘
+    base = np.asarray(cells, dtype=bool)
+    boards = np.repeat(base[np.newaxis], len(placements), axis=0)
+    ks, ys, xs = [], [], []
+    for k, (shape, px, py) in enumerate(placements):
+        for y, row in enumerate(shape):
+            for x, cell in enumerate(row):
+                if cell:
+                    ks.append(k)
+                    ys.append(py + y)
+                    xs.append(px + x)
+    boards[ks, ys, xs] = True
+    return boards
+
+
+def batch_features(boards):
+    # 与 Board.features 相同的五项特征，每项是长度为候选数的整数数组
+    count, height, width = boards.shape
+    filled = boards.any(axis=1)
+    top = boards.argmax(axis=1)
+    heights = np.where(filled, height - top, 0)
+    # 顶格以下的空格数 = 高度 - 该列方块数
+    holes = (heights - boards.sum(axis=1)).sum(axis=1)
+
+    wall = np.full((count, 1), height)
+    padded = np.concatenate([wall, heights, wall], axis=1)
+    neighbours = np.minimum(padded[:, :-2], padded[:, 2:])
+    wells = np.maximum(0, neighbours - heights).sum(axis=1)
+
+    bumpiness = np.abs(np.diff(heights, axis=1)).sum(axis=1)
+    full_lines = boards.all(axis=2).sum(axis=1)
+    return full_lines, holes, wells, bumpiness, heights.max(axis=1)
+
+
+def batch_scores(cells, placements, weights):
+    full_lines, holes, wells, bumpiness, max_height = batch_features(
+        landing_boards(cells, placements))
+    return (
+        full_lines.astype(np.float64) ** 2.5 * weights['lines']
+        - holes * weights['holes']
+        - wells * weights['wells']
+        - bumpiness * weights['bumpiness']
+        - max_height * weights['height']
+    )
+
+
+def best_index(cells, placements, weights):
+    # np.argmax 取第一个最大值，与逐个比较 score > best 的结果一致
+    return int(np.argmax(batch_scores(cells, placements, weights)))